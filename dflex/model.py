@@ -8,10 +8,14 @@
 """A module for building simulation models and state.
 """
 
+import sys
+import copy
 import math
+import array
+import warnings
 import torch
 import numpy as np
-from copy import copy
+from collections import OrderedDict, defaultdict
 
 from typing import Tuple
 from typing import List
@@ -23,6 +27,12 @@ Transform = Tuple[Vec3, Quat]
 
 from dflex.util import *
 
+# Numba is optional, it is only used to accelerate a few builder-side loops
+try:
+    import numba
+except ImportError:
+    numba = None
+
 # shape geometry types
 GEO_SPHERE = 0
 GEO_BOX = 1
@@ -39,6 +49,614 @@ JOINT_BALL = 2
 JOINT_FIXED = 3
 JOINT_FREE = 4
 
+# initial joint coordinates, velocities and targets of ball joints (coordinates are a quaternion)
+_BALL_Q_INIT = (0.0, 0.0, 0.0, 1.0)
+_BALL_QD_INIT = (0.0, 0.0, 0.0)
+_BALL_TGT_INIT = (0.0,) * 4
+
+# initial values and (zero) armature/limits of free joints (coordinates are a translation and a quaternion)
+_J_ZEROS6 = (0.0,) * 6
+_J_ZEROS7 = (0.0,) * 7
+_J_FREE_Q = (0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 1.0)
+
+# per joint type: (initial coordinates, initial velocities, initial targets, limited dof count, limit padding)
+_JOINT_LAYOUT = {
+    JOINT_PRISMATIC: ((0.0,), (0.0,), (0.0,), 1, ()),
+    JOINT_REVOLUTE: ((0.0,), (0.0,), (0.0,), 1, ()),
+    JOINT_BALL: (_BALL_Q_INIT, _BALL_QD_INIT, _BALL_TGT_INIT, 3, (0.0,)),
+    JOINT_FIXED: ((), (), (), 0, ()),
+    JOINT_FREE: (_J_FREE_Q, _J_ZEROS6, _J_ZEROS7, 0, _J_ZEROS7),
+}
+
+# corner directions of a box, in the order contacts are generated for GEO_BOX shapes
+_BOX_SIGNS = np.array([[sx, sy, sz] for sz in (-1, 1) for sy in (-1, 1) for sx in (-1, 1)], dtype=np.float32)
+
+# identity rotation, as a quaternion and as a matrix
+_QUAT_IDENTITY = (0.0, 0.0, 0.0, 1.0)
+_I3 = np.eye(3)
+
+# solid sphere volume and moment of inertia factors
+_SPHERE_VOLUME = 4.0 / 3.0 * math.pi
+_SPHERE_INERTIA = 2.0 / 5.0
+
+# meshes with at least this many triangles compute their inertia with Numba (if available)
+MESH_INERTIA_NUMBA_THRESHOLD = 10000
+
+# batches of at least this many elements compute their FEM rest poses with Numba (if available)
+REST_POSE_NUMBA_THRESHOLD = 10000
+
+# maximum number of edge-triangle pairs tested at once by _edge_tri_intersections
+_EDGE_TRI_BATCH = 1 << 18
+
+# cuts with at least this many edge-triangle pairs find intersections with Numba (if available)
+EDGE_TRI_NUMBA_THRESHOLD = 1 << 16
+
+
+def _mesh_inertia(verts, tris, com):
+    """Returns the inertia tensor (around `com`) and mass of a closed triangle mesh with density 1.0"""
+
+    # triangle vertices relative to the COM, shape (N, 3, 3)
+    v = verts[tris] - com
+
+    # each triangle forms a signed tetrahedron with the COM, integrate
+    # its second moment in closed form (Tonon 2004, Kallay 2006):
+    #
+    #   C = det/120 * (sum_k v_k v_k^T + (sum_k v_k)(sum_k v_k)^T)
+    #
+    # where det = 6*volume is the scalar triple product of the vertices
+    det = np.einsum('ij,ij->i', v[:, 0], np.cross(v[:, 1], v[:, 2]))
+    s = v.sum(axis=1)
+
+    C = (np.einsum('n,nki,nkj->ij', det, v, v) + np.einsum('n,ni,nj->ij', det, s, s)) / 120.0
+
+    I = np.eye(3, 3) * np.trace(C) - C
+    mass = np.sum(det) / 6.0
+
+    return I, mass
+
+
+if numba is not None:
+
+    @numba.njit(parallel=True, fastmath=True, cache=True)
+    def _mesh_inertia_numba(verts, tris, com):
+        """Numba version of :func:`_mesh_inertia`, parallelized over triangles"""
+
+        c00 = 0.0
+        c11 = 0.0
+        c22 = 0.0
+        c01 = 0.0
+        c02 = 0.0
+        c12 = 0.0
+        det_sum = 0.0
+
+        for t in numba.prange(tris.shape[0]):
+
+            ax = verts[tris[t, 0], 0] - com[0]
+            ay = verts[tris[t, 0], 1] - com[1]
+            az = verts[tris[t, 0], 2] - com[2]
+            bx = verts[tris[t, 1], 0] - com[0]
+            by = verts[tris[t, 1], 1] - com[1]
+            bz = verts[tris[t, 1], 2] - com[2]
+            cx = verts[tris[t, 2], 0] - com[0]
+            cy = verts[tris[t, 2], 1] - com[1]
+            cz = verts[tris[t, 2], 2] - com[2]
+
+            det = ax * (by * cz - bz * cy) - ay * (bx * cz - bz * cx) + az * (bx * cy - by * cx)
+
+            sx = ax + bx + cx
+            sy = ay + by + cy
+            sz = az + bz + cz
+
+            c00 += det * (ax * ax + bx * bx + cx * cx + sx * sx)
+            c11 += det * (ay * ay + by * by + cy * cy + sy * sy)
+            c22 += det * (az * az + bz * bz + cz * cz + sz * sz)
+            c01 += det * (ax * ay + bx * by + cx * cy + sx * sy)
+            c02 += det * (ax * az + bx * bz + cx * cz + sx * sz)
+            c12 += det * (ay * az + by * bz + cy * cz + sy * sz)
+            det_sum += det
+
+        c00 /= 120.0
+        c11 /= 120.0
+        c22 /= 120.0
+        c01 /= 120.0
+        c02 /= 120.0
+        c12 /= 120.0
+
+        I = np.empty((3, 3))
+        I[0, 0] = c11 + c22
+        I[1, 1] = c00 + c22
+        I[2, 2] = c00 + c11
+        I[0, 1] = I[1, 0] = -c01
+        I[0, 2] = I[2, 0] = -c02
+        I[1, 2] = I[2, 1] = -c12
+
+        return I, det_sum / 6.0
+
+
+def _tri_rest_poses(P):
+    """Returns the inverse 2x2 rest poses and rest pose determinants (2*area) of (N, 3, 3) triangle vertices
+
+    Degenerate triangles (zero determinant) get a zero inverse
+    """
+
+    qp = P[:, 1] - P[:, 0]
+    rp = P[:, 2] - P[:, 0]
+
+    # construct basis aligned with each triangle
+    n = normalize_batch(np.cross(qp, rp))
+    e1 = normalize_batch(qp)
+    e2 = normalize_batch(np.cross(n, e1))
+
+    R = np.stack((e1, e2), axis=1)
+    M = np.stack((qp, rp), axis=2)
+
+    D = np.einsum('nij,njk->nik', R, M)
+    det = D[:, 0, 0] * D[:, 1, 1] - D[:, 0, 1] * D[:, 1, 0]
+
+    inv_D = np.zeros_like(D)
+    valid = det != 0.0
+    inv_D[valid] = np.linalg.inv(D[valid])
+
+    return inv_D, det
+
+
+def _tet_rest_poses(P):
+    """Returns the inverse 3x3 rest poses and volumes of (N, 4, 3) tetrahedron vertices
+
+    Inverted or degenerate tetrahedra (volume <= 0) get a zero inverse
+    """
+
+    qp = P[:, 1] - P[:, 0]
+    rp = P[:, 2] - P[:, 0]
+    sp = P[:, 3] - P[:, 0]
+
+    Dm = np.stack((qp, rp, sp), axis=-1)
+
+    volume = np.einsum('ni,ni->n', qp, np.cross(rp, sp)) / 6.0
+
+    inv_Dm = np.zeros_like(Dm)
+    valid = volume > 0.0
+    inv_Dm[valid] = np.linalg.inv(Dm[valid])
+
+    return inv_Dm, volume
+
+
+def _edge_tri_intersections(origins, directions, tris, tol=1e-8):
+    """Möller–Trumbore test of (N, 3) edges origin + t * direction, t in [0, 1], against (M, 3, 3) triangles
+
+    Returns for every edge the index of the first triangle it intersects (-1 if
+    none) and the edge coordinate t of that intersection
+    """
+
+    hit_tri = np.full(len(origins), -1, dtype=np.int64)
+    hit_t = np.zeros(len(origins))
+
+    if (len(origins) == 0 or len(tris) == 0):
+        return hit_tri, hit_t
+
+    v0 = tris[:, 0]
+    edge1 = tris[:, 1] - v0
+    edge2 = tris[:, 2] - v0
+    normal = np.cross(edge1, edge2)
+
+    # bounding boxes, only overlapping edge-triangle pairs run the full test
+    ends = origins + directions
+    edge_min = np.minimum(origins, ends)
+    edge_max = np.maximum(origins, ends)
+    tri_min = tris.min(axis=1)
+    tri_max = tris.max(axis=1)
+
+    # the tolerant test accepts hits slightly outside the edge and triangle
+    pad = 2.0 * tol * (np.max(edge_max - edge_min) + np.max(tri_max - tri_min))
+    tri_min -= pad
+    tri_max += pad
+
+    batch = max(1, _EDGE_TRI_BATCH // len(tris))
+
+    for start in range(0, len(origins), batch):
+
+        overlap = np.all((edge_max[start:start + batch, None, :] >= tri_min[None, :, :]) &
+                         (edge_min[start:start + batch, None, :] <= tri_max[None, :, :]), axis=2)
+
+        # candidate pairs, ordered by edge then triangle
+        e, k = np.nonzero(overlap)
+        e += start
+
+        # signed distances of the edge end points to the triangle planes, edges that stay on one side
+        # of a plane cannot hit the triangle (the margin covers the tolerance on t)
+        d0 = np.einsum('ij,ij->i', origins[e] - v0[k], normal[k])
+        dn = np.einsum('ij,ij->i', directions[e], normal[k])
+        d1 = d0 + dn
+        margin = 2.0 * tol * np.abs(dn)
+
+        crossing = ~(((d0 > margin) & (d1 > margin)) | ((d0 < -margin) & (d1 < -margin)))
+        e, k = e[crossing], k[crossing]
+
+        d = directions[e]
+        h = np.cross(d, edge2[k])
+        a = np.einsum('ij,ij->i', edge1[k], h)
+
+        # rays parallel to a triangle never hit it
+        parallel = (a > -tol) & (a < tol)
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            f = 1.0 / a
+
+            s = origins[e] - v0[k]
+            u = f * np.einsum('ij,ij->i', s, h)
+
+            q = np.cross(s, edge1[k])
+            v = f * np.einsum('ij,ij->i', d, q)
+            t = f * np.einsum('ij,ij->i', edge2[k], q)
+
+            hit = ~parallel & (u >= -tol) & (u <= 1.0 + tol) & (v >= -tol) & (u + v <= 1.0 + tol) & (t >= -tol) & (t <= 1.0 + tol)
+
+        # keep the first triangle hit by each edge
+        e, k, t = e[hit], k[hit], t[hit]
+        e, first = np.unique(e, return_index=True)
+
+        hit_tri[e] = k[first]
+        hit_t[e] = t[first]
+
+    return hit_tri, hit_t
+
+
+def _tet_open_faces(tets):
+    """Returns the oriented boundary faces of (N, 4) tetrahedra as an (M, 3) array
+
+    Faces shared by two tetrahedra cancel, the remaining faces are returned in
+    order of appearance (face order within a tet is (0, 2, 1), (1, 2, 3),
+    (0, 1, 3), (0, 3, 2))
+    """
+
+    faces = tets[:, [0, 2, 1, 1, 2, 3, 0, 1, 3, 0, 3, 2]].reshape(-1, 3)
+
+    if (len(faces) == 0):
+        return faces
+
+    # a face that appears an odd number of times is open, its orientation and
+    # position are taken from its last occurrence
+    keys = np.sort(faces, axis=1)[::-1]
+    _, index, counts = np.unique(keys, axis=0, return_index=True, return_counts=True)
+
+    last = np.sort(len(faces) - 1 - index[counts % 2 == 1])
+
+    return faces[last]
+
+
+def _closed_start(starts, end):
+    """Returns the start offsets followed by the sentinel `end` as an int64 array"""
+
+    arr = np.empty(len(starts) + 1, dtype=np.int64)
+    arr[:-1] = starts
+    arr[-1] = end
+
+    return arr
+
+
+def _transform_array(xforms):
+    """Flattens a list of (p, q) transforms into an (N, 7) float32 array, an empty
+    list gives an empty 1D array as for the tensors created from empty lists"""
+
+    if (not len(xforms)):
+        return np.empty(0, dtype=np.float32)
+
+    arr = np.empty((len(xforms), 7), dtype=np.float32)
+    arr[:, 0:3] = [x[0] for x in xforms]
+    arr[:, 3:7] = [x[1] for x in xforms]
+
+    return arr
+
+
+_torch_dtypes = { np.float32: torch.float32, np.int32: torch.int32 }
+
+
+def _maybe_to(t, device):
+    """Moves a tensor to `device` unless it already lives there
+
+    CUDA transfers from the host go through pinned memory and do not block the host
+    """
+
+    if (t.device.type == device.type and (device.index is None or t.device.index == device.index)):
+        return t
+
+    if (t.device.type == "cpu" and device.type == "cuda"):
+        return t.pin_memory().to(device, non_blocking=True)
+
+    return t.to(device)
+
+
+def _to_device(arr, dtype, adapter, requires_grad=False):
+    """Converts a host array or tensor to a tensor of the given numpy dtype on the adapter
+
+    Host arrays for CPU adapters are aliased without a copy, tensors already on the
+    adapter are returned as they are
+    """
+
+    if (torch.is_tensor(arr)):
+        t = arr.to(dtype=_torch_dtypes[dtype])
+    else:
+        t = torch.from_numpy(np.asarray(arr, dtype=dtype, order='C'))
+
+    t = _maybe_to(t, torch.device(adapter))
+
+    return t.requires_grad_(requires_grad)
+
+
+class _Uploader:
+    """Collects host arrays and transfers them to the adapter as tensor attributes of `obj`
+
+    For CUDA adapters the arrays are packed into one pinned staging buffer, with one
+    segment per dtype, and each segment is copied without blocking. Every tensor is
+    then cloned out of the transferred buffer on the device: views of one buffer would
+    share its autograd version counter, so an in-place update of one field would
+    invalidate graphs that saved another. For CPU adapters each array is copied into
+    its own tensor directly.
+
+    Attributes are reserved on `obj` as they are added, so that they keep the order
+    of the add() calls relative to other assignments, e.g. in flatten().
+    """
+
+    # segments start at multiples of 16 elements (64 bytes)
+    _ALIGN = 16
+
+    def __init__(self, obj, adapter):
+
+        self.obj = obj
+        self.adapter = adapter
+        self.pending = []
+
+        # pinned host memory that CUDA uploads are staged in, grown on demand
+        self.staging = None
+
+    def add(self, name, values, dtype, requires_grad=False):
+
+        self.pending.append((name, np.asarray(values, dtype=dtype), requires_grad))
+        setattr(self.obj, name, None)
+
+    def _staging_buffer(self, nbytes):
+        """Returns a pinned byte tensor of at least `nbytes`"""
+
+        if (self.staging is None or self.staging.numel() < nbytes):
+            self.staging = torch.empty(nbytes, dtype=torch.uint8, pin_memory=True)
+
+        return self.staging
+
+    def upload(self):
+        """Transfers all pending arrays and assigns them as tensor attributes of `obj`"""
+
+        if (torch.device(self.adapter).type != "cuda"):
+
+            # the arrays may alias builder data, each tensor gets its own copy
+            for name, arr, requires_grad in self.pending:
+                setattr(self.obj, name, _to_device(arr.copy(), arr.dtype.type, self.adapter, requires_grad))
+
+            self.pending = []
+            return
+
+        layout = []
+        staging_size = 0
+
+        for np_dtype in (np.float32, np.int32):
+
+            group = [p for p in self.pending if p[1].dtype == np_dtype]
+
+            offsets = []
+            size = 0
+
+            for _, arr, _ in group:
+                offsets.append(size)
+                size += -(-arr.size // self._ALIGN) * self._ALIGN
+
+            layout.append((np_dtype, group, offsets, size, staging_size))
+            staging_size += size*np.dtype(np_dtype).itemsize
+
+        staging = self._staging_buffer(staging_size)
+
+        for np_dtype, group, offsets, size, staging_offset in layout:
+
+            nbytes = size*np.dtype(np_dtype).itemsize
+            host_tensor = staging[staging_offset:staging_offset + nbytes].view(_torch_dtypes[np_dtype])
+            host = host_tensor.numpy()
+
+            for (_, arr, _), offset in zip(group, offsets):
+                host[offset:offset + arr.size] = arr.ravel()
+
+            buffer = host_tensor.to(self.adapter, non_blocking=True)
+
+            for (name, arr, requires_grad), offset in zip(group, offsets):
+
+                t = buffer[offset:offset + arr.size].view(arr.shape).clone()
+                setattr(self.obj, name, t.requires_grad_(requires_grad))
+
+        self.pending = []
+
+
+if numba is not None:
+
+    # no fastmath: contracted products would turn exactly degenerate elements into tiny nonzero determinants
+    @numba.njit(parallel=True, cache=True)
+    def _tri_rest_poses_numba(P):
+        """Numba version of :func:`_tri_rest_poses`, parallelized over triangles"""
+
+        inv_D = np.zeros((P.shape[0], 2, 2))
+        det = np.zeros(P.shape[0])
+
+        for t in numba.prange(P.shape[0]):
+
+            qx = P[t, 1, 0] - P[t, 0, 0]
+            qy = P[t, 1, 1] - P[t, 0, 1]
+            qz = P[t, 1, 2] - P[t, 0, 2]
+            rx = P[t, 2, 0] - P[t, 0, 0]
+            ry = P[t, 2, 1] - P[t, 0, 1]
+            rz = P[t, 2, 2] - P[t, 0, 2]
+
+            # n = normalize(q x r)
+            nx = qy * rz - qz * ry
+            ny = qz * rx - qx * rz
+            nz = qx * ry - qy * rx
+            l = math.sqrt(nx * nx + ny * ny + nz * nz)
+            if l > 0.0:
+                nx /= l
+                ny /= l
+                nz /= l
+
+            # e1 = normalize(q)
+            ax = qx
+            ay = qy
+            az = qz
+            l = math.sqrt(ax * ax + ay * ay + az * az)
+            if l > 0.0:
+                ax /= l
+                ay /= l
+                az /= l
+
+            # e2 = normalize(n x e1)
+            bx = ny * az - nz * ay
+            by = nz * ax - nx * az
+            bz = nx * ay - ny * ax
+            l = math.sqrt(bx * bx + by * by + bz * bz)
+            if l > 0.0:
+                bx /= l
+                by /= l
+                bz /= l
+
+            d00 = ax * qx + ay * qy + az * qz
+            d01 = ax * rx + ay * ry + az * rz
+            d10 = bx * qx + by * qy + bz * qz
+            d11 = bx * rx + by * ry + bz * rz
+
+            d = d00 * d11 - d01 * d10
+            det[t] = d
+
+            if d != 0.0:
+                inv_D[t, 0, 0] = d11 / d
+                inv_D[t, 0, 1] = -d01 / d
+                inv_D[t, 1, 0] = -d10 / d
+                inv_D[t, 1, 1] = d00 / d
+
+        return inv_D, det
+
+    # no fastmath: contracted products would turn exactly degenerate elements into tiny nonzero determinants
+    @numba.njit(parallel=True, cache=True)
+    def _tet_rest_poses_numba(P):
+        """Numba version of :func:`_tet_rest_poses`, parallelized over tetrahedra"""
+
+        inv_Dm = np.zeros((P.shape[0], 3, 3))
+        volume = np.zeros(P.shape[0])
+
+        for t in numba.prange(P.shape[0]):
+
+            ax = P[t, 1, 0] - P[t, 0, 0]
+            ay = P[t, 1, 1] - P[t, 0, 1]
+            az = P[t, 1, 2] - P[t, 0, 2]
+            bx = P[t, 2, 0] - P[t, 0, 0]
+            by = P[t, 2, 1] - P[t, 0, 1]
+            bz = P[t, 2, 2] - P[t, 0, 2]
+            cx = P[t, 3, 0] - P[t, 0, 0]
+            cy = P[t, 3, 1] - P[t, 0, 1]
+            cz = P[t, 3, 2] - P[t, 0, 2]
+
+            # rows of the inverse of Dm = [a b c] are (b x c, c x a, a x b) / det
+            bcx = by * cz - bz * cy
+            bcy = bz * cx - bx * cz
+            bcz = bx * cy - by * cx
+
+            det = ax * bcx + ay * bcy + az * bcz
+            volume[t] = det / 6.0
+
+            if det > 0.0:
+                inv_Dm[t, 0, 0] = bcx / det
+                inv_Dm[t, 0, 1] = bcy / det
+                inv_Dm[t, 0, 2] = bcz / det
+                inv_Dm[t, 1, 0] = (cy * az - cz * ay) / det
+                inv_Dm[t, 1, 1] = (cz * ax - cx * az) / det
+                inv_Dm[t, 1, 2] = (cx * ay - cy * ax) / det
+                inv_Dm[t, 2, 0] = (ay * bz - az * by) / det
+                inv_Dm[t, 2, 1] = (az * bx - ax * bz) / det
+                inv_Dm[t, 2, 2] = (ax * by - ay * bx) / det
+
+        return inv_Dm, volume
+
+    @numba.njit(parallel=True, cache=True, nogil=True)
+    def _edge_tri_intersections_numba(origins, directions, tris, tol=1e-8):
+        """Numba version of :func:`_edge_tri_intersections`, parallelized over edges
+
+        Each edge runs the scalar Möller–Trumbore test and stops at its first hit
+        """
+
+        hit_tri = np.full(origins.shape[0], -1, dtype=np.int64)
+        hit_t = np.zeros(origins.shape[0])
+
+        for i in numba.prange(origins.shape[0]):
+
+            ox = origins[i, 0]
+            oy = origins[i, 1]
+            oz = origins[i, 2]
+            dx = directions[i, 0]
+            dy = directions[i, 1]
+            dz = directions[i, 2]
+
+            for j in range(tris.shape[0]):
+
+                e1x = tris[j, 1, 0] - tris[j, 0, 0]
+                e1y = tris[j, 1, 1] - tris[j, 0, 1]
+                e1z = tris[j, 1, 2] - tris[j, 0, 2]
+                e2x = tris[j, 2, 0] - tris[j, 0, 0]
+                e2y = tris[j, 2, 1] - tris[j, 0, 1]
+                e2z = tris[j, 2, 2] - tris[j, 0, 2]
+
+                sx = ox - tris[j, 0, 0]
+                sy = oy - tris[j, 0, 1]
+                sz = oz - tris[j, 0, 2]
+
+                # skip triangles whose plane the edge does not cross
+                nx = e1y * e2z - e1z * e2y
+                ny = e1z * e2x - e1x * e2z
+                nz = e1x * e2y - e1y * e2x
+
+                d0 = sx * nx + sy * ny + sz * nz
+                dn = dx * nx + dy * ny + dz * nz
+                d1 = d0 + dn
+                margin = 2.0 * tol * abs(dn)
+
+                if (d0 > margin and d1 > margin) or (d0 < -margin and d1 < -margin):
+                    continue
+
+                hx = dy * e2z - dz * e2y
+                hy = dz * e2x - dx * e2z
+                hz = dx * e2y - dy * e2x
+
+                a = e1x * hx + e1y * hy + e1z * hz
+                if -tol < a < tol:
+                    # ray is parallel to tri
+                    continue
+
+                f = 1.0 / a
+
+                u = f * (sx * hx + sy * hy + sz * hz)
+                if u < -tol or u > 1.0 + tol:
+                    continue
+
+                qx = sy * e1z - sz * e1y
+                qy = sz * e1x - sx * e1z
+                qz = sx * e1y - sy * e1x
+
+                v = f * (dx * qx + dy * qy + dz * qz)
+                if v < -tol or u + v > 1.0 + tol:
+                    continue
+
+                t = f * (e2x * qx + e2y * qy + e2z * qz)
+                if t < -tol or t > 1.0 + tol:
+                    continue
+
+                hit_tri[i] = j
+                hit_t[i] = t
+                break
+
+        return hit_tri, hit_t
+
+
 class Mesh:
     """Describes a triangle collision mesh for simulation
 
@@ -56,7 +674,9 @@ class Mesh:
 
         The mesh center of mass and inertia tensor will automatically be 
         calculated using a density of 1.0. This computation is only valid
-        if the mesh is closed (two-manifold).
+        if the mesh is closed (two-manifold). The inertia tensor and mass
+        are computed on first access, so meshes that are only used for
+        contacts do not pay for the integration.
 
         Args:
             vertices: List of vertices in the mesh
@@ -66,54 +686,77 @@ class Mesh:
         self.vertices = vertices
         self.indices = indices
 
-        # compute com and inertia (using density=1.0)
-        com = np.mean(vertices, 0)
+        self._vertices_np = np.asarray(vertices, dtype=np.float64)
+        self._indices_np = np.asarray(indices, dtype=np.int64).reshape(-1, 3)
 
-        num_tris = int(len(indices) / 3)
+        # compute com (inertia and mass are computed lazily, using density=1.0)
+        self.com = np.mean(vertices, 0)
+
+        self._inertia = None
+
+    def _integrate(self):
+
+        if (self._inertia is None):
+
+            if numba is not None and len(self._indices_np) >= MESH_INERTIA_NUMBA_THRESHOLD:
+                self._inertia = _mesh_inertia_numba(self._vertices_np, self._indices_np, self.com)
+            else:
+                self._inertia = _mesh_inertia(self._vertices_np, self._indices_np, self.com)
 
-        # compute signed inertia for each tetrahedron
-        # formed with the interior point, using an order-2
-        # quadrature: https://www.sciencedirect.com/science/article/pii/S0377042712001604#br000040
+        return self._inertia
+
+    @property
+    def I(self):
+        return self._integrate()[0]
+
+    @property
+    def mass(self):
+        return self._integrate()[1]
+
+
+class _TensorRegistry:
+    """Base class that records tensor attributes as they are assigned, so that
+    flatten() does not have to scan the instance dictionary on every call
+
+    Attributes keep the position of their first assignment as in the instance
+    dictionary, non-tensor values are recorded as None and skipped by flatten()
+    """
 
-        weight = 0.25
-        alpha = math.sqrt(5.0) / 5.0
+    def __setattr__(self, name, value):
 
-        I = np.zeros((3, 3))
-        mass = 0.0
+        object.__setattr__(self, name, value)
 
-        for i in range(num_tris):
+        tensors = self.__dict__.setdefault("_tensors", {})
+        tensors[name] = value if torch.is_tensor(value) else None
 
-            p = np.array(vertices[indices[i * 3 + 0]])
-            q = np.array(vertices[indices[i * 3 + 1]])
-            r = np.array(vertices[indices[i * 3 + 2]])
+    def __delattr__(self, name):
 
-            mid = (com + p + q + r) / 4.0
+        object.__delattr__(self, name)
+        self._tensors.pop(name, None)
 
-            pcom = p - com
-            qcom = q - com
-            rcom = r - com
+    def _copy_into(self, other, copy_value):
+        """Assigns `copy_value` of every attribute to `other`, the tensor registry is
+        rebuilt for `other` rather than shared with this instance"""
 
-            Dm = np.matrix((pcom, qcom, rcom)).T
-            volume = np.linalg.det(Dm) / 6.0
+        for name, value in self.__dict__.items():
+            if (name != "_tensors"):
+                setattr(other, name, copy_value(value))
 
-            # quadrature points lie on the line between the
-            # centroid and each vertex of the tetrahedron
-            quads = (mid + (p - mid) * alpha, mid + (q - mid) * alpha, mid + (r - mid) * alpha, mid + (com - mid) * alpha)
+        return other
 
-            for j in range(4):
+    def __copy__(self):
 
-                # displacement of quadrature point from COM
-                d = quads[j] - com
+        return self._copy_into(self.__class__.__new__(self.__class__), lambda value: value)
 
-                I += weight * volume * (length_sq(d) * np.eye(3, 3) - np.outer(d, d))
-                mass += weight * volume
+    def __deepcopy__(self, memo):
 
-        self.I = I
-        self.mass = mass
-        self.com = com
+        other = self.__class__.__new__(self.__class__)
+        memo[id(self)] = other
 
+        return self._copy_into(other, lambda value: copy.deepcopy(value, memo))
 
-class State:
+
+class State(_TensorRegistry):
     """The State object holds all *time-varying* data for a model.
     
     Time-varying data includes particle positions, velocities, rigid body states, and
@@ -146,17 +789,10 @@ class State:
         a set of all tensors owned by the state.
         """
 
-        tensors = []
-
-        # build a list of all tensor attributes
-        for attr, value in self.__dict__.items():
-            if (torch.is_tensor(value)):
-                tensors.append(value)
-
-        return tensors
+        return [t for t in self._tensors.values() if t is not None]
 
 
-class Model:
+class Model(_TensorRegistry):
     """Holds the definition of the simulation model
 
     This class holds the non-time varying description of the system, i.e.:
@@ -318,6 +954,12 @@ class Model:
         self.particle_radius = 1e-4
         self.adapter = adapter
 
+        # shape transforms expanded by collide()
+        self._collide_cache = None
+
+        # side stream used by state(), created on first use
+        self._alloc_stream = None
+
     def state(self) -> State:
         """Returns a state object for the model
 
@@ -344,38 +986,95 @@ class Model:
             s.joint_qd = torch.clone(self.joint_qd)
             s.joint_act = torch.zeros_like(self.joint_qd)
 
+        # cutting springs
+        if (self.cut_spring_count):
+            s.cut_spring_ke = torch.clone(self.cut_spring_stiffness)
+            s.cut_spring_kd = torch.clone(self.cut_spring_damping)
+
         #--------------------------------
         # derived state (output only)
-        
-        if (self.particle_count):
-            s.particle_f = torch.empty_like(self.particle_qd, requires_grad=True)
 
+        # outputs do not depend on model data, on the GPU they are allocated on a side
+        # stream so that their initialization can overlap work queued on the current stream
+        alloc_stream = self._state_alloc_stream()
 
-        if (self.link_count):
-            
-            # joints
-            s.joint_qdd = torch.zeros_like(self.joint_qd, requires_grad=True)
-            s.joint_tau = torch.zeros_like(self.joint_qd, requires_grad=True)
-            s.joint_S_s = torch.empty((self.joint_dof_count, 6), dtype=torch.float32, device=self.adapter, requires_grad=True)            
-
-            # derived rigid body data (maximal coordinates)
-            s.body_X_sc = torch.empty((self.link_count, 7), dtype=torch.float32, device=self.adapter, requires_grad=True)
-            s.body_X_sm = torch.empty((self.link_count, 7), dtype=torch.float32, device=self.adapter, requires_grad=True)
-            s.body_I_s = torch.empty((self.link_count, 6, 6), dtype=torch.float32, device=self.adapter, requires_grad=True)
-            s.body_v_s = torch.empty((self.link_count, 6), dtype=torch.float32, device=self.adapter, requires_grad=True)
-            s.body_a_s = torch.empty((self.link_count, 6), dtype=torch.float32, device=self.adapter, requires_grad=True)
-            s.body_f_s = torch.zeros((self.link_count, 6), dtype=torch.float32, device=self.adapter, requires_grad=True)
-            #s.body_ft_s = torch.zeros((self.link_count, 6), dtype=torch.float32, device=self.adapter, requires_grad=False)
-            #s.body_f_ext_s = torch.zeros((self.link_count, 6), dtype=torch.float32, device=self.adapter, requires_grad=False)
+        with torch.cuda.stream(alloc_stream):
 
-        if (self.cut_spring_count):
-            # stores 3D knife force for both sides of each cutting spring
-            s.knife_f = torch.zeros((self.cut_spring_count * 2, 3), dtype=torch.float32, device=self.adapter)
-            s.cut_spring_ke = torch.clone(self.cut_spring_stiffness)
-            s.cut_spring_kd = torch.clone(self.cut_spring_damping)
+            if (self.particle_count):
+                s.particle_f = torch.empty_like(self.particle_qd, requires_grad=True)
+
+            if (self.link_count):
+
+                # joints
+                s.joint_qdd = torch.zeros_like(self.joint_qd, requires_grad=True)
+                s.joint_tau = torch.zeros_like(self.joint_qd, requires_grad=True)
+                s.joint_S_s = torch.empty((self.joint_dof_count, 6), dtype=torch.float32, device=self.adapter, requires_grad=True)
+
+                # derived rigid body data (maximal coordinates)
+                s.body_X_sc = torch.empty((self.link_count, 7), dtype=torch.float32, device=self.adapter, requires_grad=True)
+                s.body_X_sm = torch.empty((self.link_count, 7), dtype=torch.float32, device=self.adapter, requires_grad=True)
+                s.body_I_s = torch.empty((self.link_count, 6, 6), dtype=torch.float32, device=self.adapter, requires_grad=True)
+                s.body_v_s = torch.empty((self.link_count, 6), dtype=torch.float32, device=self.adapter, requires_grad=True)
+                s.body_a_s = torch.empty((self.link_count, 6), dtype=torch.float32, device=self.adapter, requires_grad=True)
+                s.body_f_s = torch.zeros((self.link_count, 6), dtype=torch.float32, device=self.adapter, requires_grad=True)
+                #s.body_ft_s = torch.zeros((self.link_count, 6), dtype=torch.float32, device=self.adapter, requires_grad=False)
+                #s.body_f_ext_s = torch.zeros((self.link_count, 6), dtype=torch.float32, device=self.adapter, requires_grad=False)
+
+            if (self.cut_spring_count):
+                # stores 3D knife force for both sides of each cutting spring
+                s.knife_f = torch.zeros((self.cut_spring_count * 2, 3), dtype=torch.float32, device=self.adapter)
+
+        if (alloc_stream is not None):
+
+            # order the current stream after the initialization, and tell the caching
+            # allocator the tensors are used there
+            current_stream = torch.cuda.current_stream(alloc_stream.device)
+            current_stream.wait_stream(alloc_stream)
+
+            for t in s.flatten():
+                t.record_stream(current_stream)
 
         return s
 
+    def _state_alloc_stream(self):
+        """Returns the CUDA stream used to initialize state outputs, or None for CPU models"""
+
+        if (torch.device(self.adapter).type != "cuda"):
+            return None
+
+        if (self._alloc_stream is None):
+            self._alloc_stream = torch.cuda.Stream(device=self.adapter)
+
+        return self._alloc_stream
+
+    def reset(self, state: State):
+        """Resets an existing state object to the model's initial configuration in-place
+
+        This reuses the storage of a state previously returned by :func:`Model.state()`
+        instead of allocating new tensors, e.g.: when restarting a rollout. The state
+        should not be part of a computational graph that is still to be differentiated.
+        """
+
+        with torch.no_grad():
+
+            if (self.particle_count):
+                state.particle_q.copy_(self.particle_q)
+                state.particle_qd.copy_(self.particle_qd)
+
+            if (self.link_count):
+                state.joint_q.copy_(self.joint_q)
+                state.joint_qd.copy_(self.joint_qd)
+                state.joint_act.zero_()
+
+                state.joint_qdd.zero_()
+                state.joint_tau.zero_()
+                state.body_f_s.zero_()
+
+            if (self.cut_spring_count):
+                state.knife_f.zero_()
+                state.cut_spring_ke.copy_(self.cut_spring_stiffness)
+                state.cut_spring_kd.copy_(self.cut_spring_damping)
+
     def alloc_mass_matrix(self):
 
         if (self.link_count):
@@ -396,14 +1095,7 @@ class Model:
         a set of all tensors owned by the model.
         """
 
-        tensors = []
-
-        # build a list of all tensor attributes
-        for attr, value in self.__dict__.items():
-            if (torch.is_tensor(value)):
-                tensors.append(value)
-
-        return tensors
+        return [t for t in self._tensors.values() if t is not None]
 
     # builds contacts
     def collide(self, state: State):
@@ -432,72 +1124,90 @@ class Model:
             it is acceptable to call this method once at initialization time.
         """
 
-        body0 = []
-        body1 = []
-        point = []
-        dist = []
-        mat = []
+        # fetch shape data once rather than per-element (avoids a device sync per access)
+        shape_body = self.shape_body.cpu().numpy()
+        shape_types = self.shape_geo_type.cpu().numpy()
+        shape_scales = self.shape_geo_scale.detach().cpu().numpy()
 
-        def add_contact(b0, b1, t, p0, d, m):
-            body0.append(b0)
-            body1.append(b1)
-            point.append(transform_point(t, np.array(p0)))
-            dist.append(d)
-            mat.append(m)
+        # shape to body transforms, with all rotation matrices computed in one batch, these
+        # are reused by later calls until shape_transform is reassigned or modified in-place
+        cache = self._collide_cache
 
-        for i in range(self.shape_count):
+        if (cache is None or cache[0] is not self.shape_transform or cache[1] != self.shape_transform._version):
 
-            # transform from shape to body
-            X_bs = transform_expand(self.shape_transform[i].tolist())
+            shape_xforms = self.shape_transform.detach().cpu().numpy().reshape(-1, 7)
 
-            geo_type = self.shape_geo_type[i].item()
+            shape_pos = shape_xforms[:, 0:3]
+            shape_rot = quat_to_matrix_batch(shape_xforms[:, 3:7])
 
-            if (geo_type == GEO_SPHERE):
+            self._collide_cache = (self.shape_transform, self.shape_transform._version, shape_pos, shape_rot)
 
-                radius = self.shape_geo_scale[i][0].item()
+        else:
+            shape_pos, shape_rot = cache[2], cache[3]
 
-                add_contact(self.shape_body[i], -1, X_bs, (0.0, 0.0, 0.0), radius, i)
+        # contact points of each shape in its local frame, and the distance to maintain
+        shape_contacts = []
 
-            elif (geo_type == GEO_CAPSULE):
+        for i in range(self.shape_count):
 
-                radius = self.shape_geo_scale[i][0].item()
-                half_width = self.shape_geo_scale[i][1].item()
+            geo_type = int(shape_types[i])
+            scale = shape_scales[i]
 
-                add_contact(self.shape_body[i], -1, X_bs, (-half_width, 0.0, 0.0), radius, i)
-                add_contact(self.shape_body[i], -1, X_bs, (half_width, 0.0, 0.0), radius, i)
+            if (geo_type == GEO_SPHERE):
+                shape_contacts.append((i, np.zeros((1, 3)), scale[0]))
+
+            elif (geo_type == GEO_CAPSULE):
+                half_width = scale[1]
+                shape_contacts.append((i, np.array(((-half_width, 0.0, 0.0), (half_width, 0.0, 0.0))), scale[0]))
 
             elif (geo_type == GEO_BOX):
+                shape_contacts.append((i, scale * _BOX_SIGNS, 0.0))
 
-                edges = self.shape_geo_scale[i].tolist()
+            elif (geo_type == GEO_MESH):
+                shape_contacts.append((i, np.asarray(self.shape_geo_src[i].vertices) * scale, 0.0))
 
-                add_contact(self.shape_body[i], -1, X_bs, (-edges[0], -edges[1], -edges[2]), 0.0, i)        
-                add_contact(self.shape_body[i], -1, X_bs, ( edges[0], -edges[1], -edges[2]), 0.0, i)
-                add_contact(self.shape_body[i], -1, X_bs, (-edges[0],  edges[1], -edges[2]), 0.0, i)
-                add_contact(self.shape_body[i], -1, X_bs, (edges[0], edges[1], -edges[2]), 0.0, i)
-                add_contact(self.shape_body[i], -1, X_bs, (-edges[0], -edges[1], edges[2]), 0.0, i)
-                add_contact(self.shape_body[i], -1, X_bs, (edges[0], -edges[1], edges[2]), 0.0, i)
-                add_contact(self.shape_body[i], -1, X_bs, (-edges[0], edges[1], edges[2]), 0.0, i)
-                add_contact(self.shape_body[i], -1, X_bs, (edges[0], edges[1], edges[2]), 0.0, i)
+        contact_count = sum(len(points) for _, points, _ in shape_contacts)
 
-            elif (geo_type == GEO_MESH):
+        # stage all contact data in one float and one int buffer (pinned when targeting
+        # the GPU), so that only two host-device copies are needed
+        pinned = torch.device(self.adapter).type == "cuda"
+
+        float_buffer = torch.empty(contact_count * 4, dtype=torch.float32, pin_memory=pinned)
+        int_buffer = torch.empty(contact_count * 3, dtype=torch.int32, pin_memory=pinned)
+
+        point = float_buffer[:contact_count * 3].numpy().reshape(contact_count, 3)
+        dist = float_buffer[contact_count * 3:].numpy()
+
+        body0 = int_buffer[:contact_count].numpy()
+        body1 = int_buffer[contact_count:contact_count * 2].numpy()
+        mat = int_buffer[contact_count * 2:].numpy()
+
+        body1[:] = -1
 
-                mesh = self.shape_geo_src[i]
-                scale = self.shape_geo_scale[i].detach().cpu().numpy()
+        cursor = 0
 
-                for v in mesh.vertices:
+        for i, points, d in shape_contacts:
 
-                    p = (v[0] * scale[0], v[1] * scale[1], v[2] * scale[2])
+            end = cursor + len(points)
 
-                    add_contact(self.shape_body[i], -1, X_bs, p, 0.0, i)
+            body0[cursor:end] = shape_body[i]
+            point[cursor:end] = points @ shape_rot[i].T + shape_pos[i]
+            dist[cursor:end] = d
+            mat[cursor:end] = i
+
+            cursor = end
 
         # send to torch
-        self.contact_body0 = torch.tensor(body0, dtype=torch.int32, device=self.adapter)
-        self.contact_body1 = torch.tensor(body1, dtype=torch.int32, device=self.adapter)
-        self.contact_point0 = torch.tensor(point, dtype=torch.float32, device=self.adapter)
-        self.contact_dist = torch.tensor(dist, dtype=torch.float32, device=self.adapter)
-        self.contact_material = torch.tensor(mat, dtype=torch.int32, device=self.adapter)
+        float_buffer = float_buffer.to(self.adapter, non_blocking=True)
+        int_buffer = int_buffer.to(self.adapter, non_blocking=True)
+
+        self.contact_body0 = int_buffer[:contact_count]
+        self.contact_body1 = int_buffer[contact_count:contact_count * 2]
+        self.contact_point0 = float_buffer[:contact_count * 3].view(contact_count, 3)
+        self.contact_dist = float_buffer[contact_count * 3:]
+        self.contact_material = int_buffer[contact_count * 2:]
 
-        self.contact_count = len(body0)
+        self.contact_count = contact_count
 
 
 
@@ -540,7 +1250,7 @@ class ModelBuilder:
         # particles
         self.particle_q = []
         self.particle_qd = []
-        self.particle_mass = []
+        self.particle_mass = array.array('d')
 
         # shapes
         self.shape_transform = []
@@ -555,11 +1265,11 @@ class ModelBuilder:
         self.geo_sdfs = []
 
         # springs
-        self.spring_indices = []
-        self.spring_rest_length = []
-        self.spring_stiffness = []
-        self.spring_damping = []
-        self.spring_control = []
+        self.spring_indices = array.array('i')
+        self.spring_rest_length = array.array('d')
+        self.spring_stiffness = array.array('d')
+        self.spring_damping = array.array('d')
+        self.spring_control = array.array('d')
 
         # triangles
         self.tri_indices = []
@@ -586,31 +1296,31 @@ class ModelBuilder:
         self.muscle_points = []
 
         # rigid bodies
-        self.joint_parent = []         # index of the parent body                      (constant)
-        self.joint_child = []          # index of the child body                       (constant)
-        self.joint_axis = []           # joint axis in child joint frame               (constant)
-        self.joint_X_pj = []           # frame of joint in parent                      (constant)
-        self.joint_X_cm = []           # frame of child com (in child coordinates)     (constant)
-
-        self.joint_q_start = []        # joint offset in the q array
-        self.joint_qd_start = []       # joint offset in the qd array
-        self.joint_type = []
-        self.joint_armature = []
-        self.joint_target_ke = []
-        self.joint_target_kd = []
-        self.joint_target = []
-        self.joint_limit_lower = []
-        self.joint_limit_upper = []
-        self.joint_limit_ke = []
-        self.joint_limit_kd = []
-
-        self.joint_q = []              # generalized coordinates       (input)
-        self.joint_qd = []             # generalized velocities        (input)
-        self.joint_qdd = []            # generalized accelerations     (id,fd)
-        self.joint_tau = []            # generalized actuation         (input)
-        self.joint_u = []              # generalized total torque      (fd)
-
-        self.body_mass = []
+        self.joint_parent = array.array('i')    # index of the parent body                      (constant)
+        self.joint_child = []                   # index of the child body                       (constant)
+        self.joint_axis = []                    # joint axis in child joint frame               (constant)
+        self.joint_X_pj = []                    # frame of joint in parent                      (constant)
+        self.joint_X_cm = []                    # frame of child com (in child coordinates)     (constant)
+
+        self.joint_q_start = array.array('i')   # joint offset in the q array
+        self.joint_qd_start = array.array('i')  # joint offset in the qd array
+        self.joint_type = array.array('i')
+        self.joint_armature = array.array('d')
+        self.joint_target_ke = array.array('d')
+        self.joint_target_kd = array.array('d')
+        self.joint_target = array.array('d')
+        self.joint_limit_lower = array.array('d')
+        self.joint_limit_upper = array.array('d')
+        self.joint_limit_ke = array.array('d')
+        self.joint_limit_kd = array.array('d')
+
+        self.joint_q = array.array('d')         # generalized coordinates       (input)
+        self.joint_qd = array.array('d')        # generalized velocities        (input)
+        self.joint_qdd = []                     # generalized accelerations     (id,fd)
+        self.joint_tau = []                     # generalized actuation         (input)
+        self.joint_u = []                       # generalized total torque      (fd)
+
+        self.body_mass = array.array('d')
         self.body_inertia = []
         self.body_com = []
 
@@ -721,106 +1431,23 @@ class ModelBuilder:
         self.joint_q_start.append(len(self.joint_q))
         self.joint_qd_start.append(len(self.joint_qd))
 
-        if (type == JOINT_PRISMATIC):
-            self.joint_q.append(0.0)
-            self.joint_qd.append(0.0)
-            self.joint_target.append(0.0)
-            self.joint_armature.append(armature)
-            self.joint_limit_lower.append(limit_lower)
-            self.joint_limit_upper.append(limit_upper)
-
-        elif (type == JOINT_REVOLUTE):
-            self.joint_q.append(0.0)
-            self.joint_qd.append(0.0)
-            self.joint_target.append(0.0)
-            self.joint_armature.append(armature)
-            self.joint_limit_lower.append(limit_lower)
-            self.joint_limit_upper.append(limit_upper)
-
-        elif (type == JOINT_BALL):
-            
-            # quaternion
-            self.joint_q.append(0.0)
-            self.joint_q.append(0.0)
-            self.joint_q.append(0.0)
-            self.joint_q.append(1.0)
-
-            # angular velocity
-            self.joint_qd.append(0.0)
-            self.joint_qd.append(0.0)
-            self.joint_qd.append(0.0)
-
-            # pd targets
-            self.joint_target.append(0.0)
-            self.joint_target.append(0.0)
-            self.joint_target.append(0.0)
-            self.joint_target.append(0.0)
-
-            self.joint_armature.append(armature)
-            self.joint_armature.append(armature)
-            self.joint_armature.append(armature)
-
-            self.joint_limit_lower.append(limit_lower)
-            self.joint_limit_lower.append(limit_lower)
-            self.joint_limit_lower.append(limit_lower)
-            self.joint_limit_lower.append(0.0)
-                       
-            self.joint_limit_upper.append(limit_upper)
-            self.joint_limit_upper.append(limit_upper)
-            self.joint_limit_upper.append(limit_upper)
-            self.joint_limit_upper.append(0.0)
-
-
-        elif (type == JOINT_FIXED):
-            pass
-        elif (type == JOINT_FREE):
-
-            # translation
-            self.joint_q.append(0.0)
-            self.joint_q.append(0.0)
-            self.joint_q.append(0.0)
-
-            # quaternion
-            self.joint_q.append(0.0)
-            self.joint_q.append(0.0)
-            self.joint_q.append(0.0)
-            self.joint_q.append(1.0)
+        q_init, qd_init, target_init, limit_count, limit_pad = _JOINT_LAYOUT[type]
+
+        self.joint_q.extend(q_init)
+        self.joint_qd.extend(qd_init)
+        self.joint_target.extend(target_init)
+
+        if (type == JOINT_FREE):
 
             # note armature for free joints should always be zero, better to modify the body inertia directly
-            self.joint_armature.append(0.0)
-            self.joint_armature.append(0.0)
-            self.joint_armature.append(0.0)
-            self.joint_armature.append(0.0)
-            self.joint_armature.append(0.0)
-            self.joint_armature.append(0.0)
-
-            self.joint_target.append(0.0)
-            self.joint_target.append(0.0)
-            self.joint_target.append(0.0)
-            self.joint_target.append(0.0)
-            self.joint_target.append(0.0)
-            self.joint_target.append(0.0)
-            self.joint_target.append(0.0)
-
-            self.joint_limit_lower.append(0.0)
-            self.joint_limit_lower.append(0.0)
-            self.joint_limit_lower.append(0.0)
-            self.joint_limit_lower.append(0.0)
-            self.joint_limit_lower.append(0.0)
-            self.joint_limit_lower.append(0.0)
-            self.joint_limit_lower.append(0.0)
-                       
-            self.joint_limit_upper.append(0.0)
-            self.joint_limit_upper.append(0.0)
-            self.joint_limit_upper.append(0.0)
-            self.joint_limit_upper.append(0.0)
-            self.joint_limit_upper.append(0.0)
-            self.joint_limit_upper.append(0.0)
-            self.joint_limit_upper.append(0.0)
-
-            # joint velocities
-            for i in range(6):
-                self.joint_qd.append(0.0)
+            self.joint_armature.extend(_J_ZEROS6)
+            self.joint_limit_lower.extend(_J_ZEROS7)
+            self.joint_limit_upper.extend(_J_ZEROS7)
+
+        else:
+            self.joint_armature.extend((armature,) * len(qd_init))
+            self.joint_limit_lower.extend((limit_lower,) * limit_count + limit_pad)
+            self.joint_limit_upper.extend((limit_upper,) * limit_count + limit_pad)
 
         self.body_inertia.append(np.zeros((3, 3)))
         self.body_mass.append(0.0)
@@ -991,9 +1618,19 @@ class ModelBuilder:
         self.shape_geo_src.append(src)
         self.shape_materials.append((ke, kd, kf, mu))
 
+        # static shapes do not contribute mass
+        if (body == -1):
+            return
+
         (m, I) = self._compute_shape_mass(type, scale, src, density)
 
-        self._update_body_mass(body, m, I, np.array(pos), np.array(rot))
+        # rotation of the shape relative to the body, computed once per shape
+        if (tuple(rot) == _QUAT_IDENTITY):
+            R = _I3
+        else:
+            R = quat_to_matrix(rot)
+
+        self._update_body_mass(body, m, I, np.array(pos), R)
 
     # particles
     def add_particle(self, pos : Vec3, vel : Vec3, mass : float) -> int:
@@ -1016,6 +1653,30 @@ class ModelBuilder:
 
         return len(self.particle_q) - 1
 
+    def _particle_q_array(self) -> np.ndarray:
+        """Returns particle positions as an (N, 3) float64 array"""
+
+        return np.asarray(self.particle_q, dtype=np.float64).reshape(-1, 3)
+
+    def _copy_particles(self, ids) -> int:
+        """Appends copies of the given particles (position, velocity and mass) in one batch
+
+        Returns:
+            The index of the first copy
+        """
+        start = len(self.particle_q)
+
+        if (len(ids) == 0):
+            return start
+
+        ids = np.asarray(ids, dtype=np.int64)
+
+        self.particle_q.extend(list(self._particle_q_array()[ids]))
+        self.particle_qd.extend(list(np.asarray(self.particle_qd, dtype=np.float64).reshape(-1, 3)[ids]))
+        self.particle_mass.extend(np.array(self.particle_mass)[ids].tolist())
+
+        return start
+
     def add_spring(self, i : int, j, ke : float, kd : float, control: float):
         """Adds a spring between two particles in the system
 
@@ -1081,10 +1742,10 @@ class ModelBuilder:
         e1 = normalize(qp)
         e2 = normalize(np.cross(n, e1))
 
-        R = np.matrix((e1, e2))
-        M = np.matrix((qp, rp))
+        R = np.stack((e1, e2))
+        M = np.stack((qp, rp))
 
-        D = R * M.T
+        D = R @ M.T
         inv_D = np.linalg.inv(D)
 
         area = np.linalg.det(D) / 2.0
@@ -1098,6 +1759,50 @@ class ModelBuilder:
 
         return area
 
+    def _add_triangles_bulk(self, ijk: np.ndarray, skip_singular: bool=False) -> np.ndarray:
+        """Adds a batch of trianglular FEM elements, see :func:`add_triangle`
+
+        Args:
+            ijk: An (N, 3) array of particle indices, one row per triangle
+            skip_singular: If true degenerate triangles are dropped instead of raising
+
+        Return:
+            The areas of the added triangles
+        """
+        ijk = np.asarray(ijk, dtype=np.int64).reshape(-1, 3)
+
+        if (len(ijk) == 0):
+            return np.zeros(0)
+
+        P = self._particle_q_array()[ijk]
+
+        if numba is not None and len(ijk) >= REST_POSE_NUMBA_THRESHOLD:
+            inv_D, det = _tri_rest_poses_numba(P)
+        else:
+            inv_D, det = _tri_rest_poses(P)
+
+        singular = det == 0.0
+
+        if (singular.any()):
+            if (not skip_singular):
+                raise np.linalg.LinAlgError("Singular matrix")
+
+            valid = ~singular
+            ijk, inv_D, det = ijk[valid], inv_D[valid], det[valid]
+
+        area = det / 2.0
+
+        inverted = np.count_nonzero(area < 0.0)
+
+        if (inverted):
+            warnings.warn("{} inverted triangle elements".format(inverted))
+
+        self.tri_indices.extend(map(tuple, ijk.tolist()))
+        self.tri_poses.extend(inv_D.tolist())
+        self.tri_activations.extend([0.0] * len(ijk))
+
+        return area
+
     def add_tetrahedron(self, i: int, j: int, k: int, l: int, k_mu: float=1.e+3, k_lambda: float=1.e+3, k_damp: float=0.0) -> float:
         """Adds a tetrahedral FEM element between four particles in the system. 
 
@@ -1130,21 +1835,66 @@ class ModelBuilder:
         rp = r - p
         sp = s - p
 
-        Dm = np.matrix((qp, rp, sp)).T
-        volume = np.linalg.det(Dm) / 6.0
+        Dm = np.stack((qp, rp, sp), axis=1)
+
+        # scalar triple product qp.(rp x sp), avoids a LAPACK call for a 3x3 determinant
+        volume = (qp[0] * (rp[1] * sp[2] - rp[2] * sp[1]) -
+                  qp[1] * (rp[0] * sp[2] - rp[2] * sp[0]) +
+                  qp[2] * (rp[0] * sp[1] - rp[1] * sp[0])) / 6.0
 
         if (volume <= 0.0):
             print("inverted tetrahedral element")
+            return volume
+
+        inv_Dm = np.linalg.inv(Dm)
+
+        self.tet_indices.append((i, j, k, l))
+        self.tet_poses.append(inv_Dm.tolist())
+        self.tet_activations.append(0.0)
+        self.tet_mu.append(k_mu)
+        self.tet_lambda.append(k_lambda)
+        self.tet_damping.append(k_damp)
+
+        return volume
+
+    def _add_tets_bulk(self, ijkl: np.ndarray, k_mu: float=1.e+3, k_lambda: float=1.e+3, k_damp: float=0.0) -> np.ndarray:
+        """Adds a batch of tetrahedral FEM elements, see :func:`add_tetrahedron`
+
+        Args:
+            ijkl: An (N, 4) array of particle indices, one row per tetrahedron
+            k_mu: The first elastic Lame parameter
+            k_lambda: The second elastic Lame parameter
+            k_damp: The elements' damping stiffness
+
+        Return:
+            The volumes of all input tetrahedra, inverted elements (volume <= 0) are not added
+        """
+        ijkl = np.asarray(ijkl, dtype=np.int64).reshape(-1, 4)
+
+        if (len(ijkl) == 0):
+            return np.zeros(0)
+
+        P = self._particle_q_array()[ijkl]
+
+        if numba is not None and len(ijkl) >= REST_POSE_NUMBA_THRESHOLD:
+            inv_Dm, volume = _tet_rest_poses_numba(P)
         else:
+            inv_Dm, volume = _tet_rest_poses(P)
 
-            inv_Dm = np.linalg.inv(Dm)
+        good = volume > 0.0
+        count = int(np.count_nonzero(good))
 
-            self.tet_indices.append((i, j, k, l))
-            self.tet_poses.append(inv_Dm.tolist())
-            self.tet_activations.append(0.0)
-            self.tet_mu.append(k_mu)
-            self.tet_lambda.append(k_lambda)
-            self.tet_damping.append(k_damp)
+        if (count < len(ijkl)):
+            warnings.warn("{} inverted tetrahedral elements discarded".format(len(ijkl) - count))
+
+        inv_Dm = inv_Dm[good]
+
+        self.tet_indices.extend(map(tuple, ijkl[good].tolist()))
+        self.tet_poses.extend(inv_Dm.tolist())
+        self.tet_activations.extend([0.0] * count)
+        self.tet_mu.extend([k_mu] * count)
+        self.tet_lambda.extend([k_lambda] * count)
+        self.tet_damping.extend([k_damp] * count)
 
         return volume
 
@@ -1190,6 +1940,36 @@ class ModelBuilder:
         self.edge_indices.append((i, j, k, l))
         self.edge_rest_angle.append(rest)
 
+    def _add_edges_bulk(self, ijkl: np.ndarray):
+        """Adds a batch of bending edge elements with rest angles computed from the current configuration, see :func:`add_edge`
+
+        Args:
+            ijkl: An (N, 4) array of particle indices (opposite 0, opposite 1, vertex 0, vertex 1), one row per edge
+        """
+        ijkl = np.asarray(ijkl, dtype=np.int64).reshape(-1, 4)
+
+        if (len(ijkl) == 0):
+            return
+
+        P = self._particle_q_array()[ijkl]
+
+        x1 = P[:, 0]
+        x2 = P[:, 1]
+        x3 = P[:, 2]
+        x4 = P[:, 3]
+
+        n1 = normalize_batch(np.cross(x3 - x1, x4 - x1))
+        n2 = normalize_batch(np.cross(x4 - x2, x3 - x2))
+        e = normalize_batch(x4 - x3)
+
+        d = np.clip(np.einsum('ij,ij->i', n2, n1), -1.0, 1.0)
+
+        angle = np.arccos(d)
+        sign = np.sign(np.einsum('ij,ij->i', np.cross(n2, n1), e))
+
+        self.edge_indices.extend(map(tuple, ijkl.tolist()))
+        self.edge_rest_angle.extend((angle * sign).tolist())
+
     def add_cloth_grid(self,
                        pos: Vec3,
                        rot: Quat,
@@ -1227,57 +2007,49 @@ class ModelBuilder:
 
         """ 
 
-        def grid_index(x, y, dim_x):
-            return y * dim_x + x
-
-
         start_vertex = len(self.particle_q)
         start_tri = len(self.tri_indices)
 
-        for y in range(0, dim_y + 1):
-            for x in range(0, dim_x + 1):
+        # particle grid in the cloth's local frame, x varies fastest
+        gx, gy = np.meshgrid(np.arange(dim_x + 1) * cell_x, np.arange(dim_y + 1) * cell_y)
+        grid = np.stack((gx.ravel(), gy.ravel(), np.zeros(gx.size)), axis=1)
 
-                g = np.array((x * cell_x, y * cell_y, 0.0))
-                p = quat_rotate(rot, g) + pos
-                m = mass
+        # rotate all particles at once
+        particles = grid @ quat_to_matrix(rot).T + pos
 
-                if (x == 0 and fix_left):
-                    m = 0.0
-                elif (x == dim_x and fix_right):
-                    m = 0.0
-                elif (y == 0 and fix_bottom):
-                    m = 0.0
-                elif (y == dim_y and fix_top):
-                    m = 0.0
+        # boundary particles can be made kinematic
+        masses = np.full((dim_y + 1, dim_x + 1), mass)
 
-                self.add_particle(p, vel, m)
+        if (fix_left):
+            masses[:, 0] = 0.0
+        if (fix_right):
+            masses[:, dim_x] = 0.0
+        if (fix_bottom):
+            masses[0, :] = 0.0
+        if (fix_top):
+            masses[dim_y, :] = 0.0
 
-                if (x > 0 and y > 0):
+        num_particles = len(particles)
 
-                    if (reverse_winding):
-                        tri1 = (start_vertex + grid_index(x - 1, y - 1, dim_x + 1),
-                                start_vertex + grid_index(x, y - 1, dim_x + 1),
-                                start_vertex + grid_index(x, y, dim_x + 1))
+        self.particle_q.extend(list(particles))
+        self.particle_qd.extend([vel] * num_particles)
+        self.particle_mass.extend(masses.ravel().tolist())
 
-                        tri2 = (start_vertex + grid_index(x - 1, y - 1, dim_x + 1),
-                                start_vertex + grid_index(x, y, dim_x + 1),
-                                start_vertex + grid_index(x - 1, y, dim_x + 1))
-
-                        self.add_triangle(*tri1)
-                        self.add_triangle(*tri2)
-
-                    else:
+        # corner particles of each cell, cells ordered like the particles
+        cx, cy = np.meshgrid(np.arange(dim_x), np.arange(dim_y))
 
-                        tri1 = (start_vertex + grid_index(x - 1, y - 1, dim_x + 1),
-                                start_vertex + grid_index(x, y - 1, dim_x + 1),
-                                start_vertex + grid_index(x - 1, y, dim_x + 1))
+        i00 = start_vertex + cy.ravel() * (dim_x + 1) + cx.ravel()
+        i10 = i00 + 1
+        i01 = i00 + dim_x + 1
+        i11 = i01 + 1
 
-                        tri2 = (start_vertex + grid_index(x, y - 1, dim_x + 1),
-                                start_vertex + grid_index(x, y, dim_x + 1),
-                                start_vertex + grid_index(x - 1, y, dim_x + 1))
+        # two triangles per cell
+        if (reverse_winding):
+            tris = np.stack((i00, i10, i11, i00, i11, i01), axis=1)
+        else:
+            tris = np.stack((i00, i10, i01, i10, i11, i01), axis=1)
 
-                        self.add_triangle(*tri1)
-                        self.add_triangle(*tri2)
+        self._add_triangles_bulk(tris.reshape(-1, 3))
 
         end_vertex = len(self.particle_q)
         end_tri = len(self.tri_indices)
@@ -1286,13 +2058,7 @@ class ModelBuilder:
         # is a good test of the adjacency structure
         adj = MeshAdjacency(self.tri_indices[start_tri:end_tri], end_tri - start_tri)
 
-        for k, e in adj.edges.items():
-
-            # skip open edges
-            if (e.f0 == -1 or e.f1 == -1):
-                continue
-
-            self.add_edge(e.o0, e.o1, e.v0, e.v1)          # opposite 0, opposite 1, vertex 0, vertex 1
+        self._add_edges_bulk(adj.interior_edge_array())
 
     def add_cloth_mesh(self, pos: Vec3, rot: Quat, scale: float, vel: Vec3, vertices: List[Vec3], indices: List[int], density: float, edge_callback=None, face_callback=None):
         """Helper to create a cloth model from a regular triangle mesh
@@ -1321,30 +2087,27 @@ class ModelBuilder:
         start_tri = len(self.tri_indices)
 
         # particles
-        for i, v in enumerate(vertices):
+        particles = np.asarray(vertices, dtype=np.float64).reshape(-1, 3) * scale @ quat_to_matrix(rot).T + pos
 
-            p = quat_rotate(rot, v * scale) + pos
-
-            self.add_particle(p, vel, 0.0)
+        self.particle_q.extend(list(particles))
+        self.particle_qd.extend([vel] * len(particles))
+        self.particle_mass.extend([0.0] * len(particles))
 
         # triangles
-        for t in range(num_tris):
-
-            i = start_vertex + indices[t * 3 + 0]
-            j = start_vertex + indices[t * 3 + 1]
-            k = start_vertex + indices[t * 3 + 2]
+        tris = start_vertex + np.asarray(indices, dtype=np.int64)[:num_tris * 3].reshape(-1, 3)
 
-            if (face_callback):
+        if (face_callback):
+            for i, j, k in tris.tolist():
                 face_callback(i, j, k)
 
-            area = self.add_triangle(i, j, k)
+        areas = self._add_triangles_bulk(tris)
 
-            # add area fraction to particles
-            if (area > 0.0):
+        # add area fraction to particles
+        good = areas > 0.0
 
-                self.particle_mass[i] += density * area / 3.0
-                self.particle_mass[j] += density * area / 3.0
-                self.particle_mass[k] += density * area / 3.0
+        mass = np.array(self.particle_mass[start_vertex:], dtype=np.float64)
+        np.add.at(mass, tris[good].ravel() - start_vertex, np.repeat(density * areas[good] / 3.0, 3))
+        self.particle_mass[start_vertex:] = array.array('d', mass.tobytes())
 
         end_vertex = len(self.particle_q)
         end_tri = len(self.tri_indices)
@@ -1352,16 +2115,16 @@ class ModelBuilder:
         adj = MeshAdjacency(self.tri_indices[start_tri:end_tri], end_tri - start_tri)
 
         # bend constraints
-        for k, e in adj.edges.items():
+        if (edge_callback):
+            for k, e in adj.edges.items():
 
-            # skip open edges
-            if (e.f0 == -1 or e.f1 == -1):
-                continue
+                # skip open edges
+                if (e.f0 == -1 or e.f1 == -1):
+                    continue
 
-            if (edge_callback):
                 edge_callback(e.f0, e.f1)
 
-            self.add_edge(e.o0, e.o1, e.v0, e.v1)
+        self._add_edges_bulk(adj.interior_edge_array())
 
     def add_soft_grid(self,
                       pos: Vec3,
@@ -1411,83 +2174,66 @@ class ModelBuilder:
 
         mass = cell_x * cell_y * cell_z * density
 
-        for z in range(dim_z + 1):
-            for y in range(dim_y + 1):
-                for x in range(dim_x + 1):
-
-                    v = np.array((x * cell_x, y * cell_y, z * cell_z))
-                    m = mass
-
-                    if (fix_left and x == 0):
-                        m = 0.0
+        # particle grid in the solid's local frame, x varies fastest
+        gz, gy, gx = np.meshgrid(np.arange(dim_z + 1) * cell_z, np.arange(dim_y + 1) * cell_y, np.arange(dim_x + 1) * cell_x, indexing='ij')
+        grid = np.stack((gx.ravel(), gy.ravel(), gz.ravel()), axis=1)
 
-                    if (fix_right and x == dim_x):
-                        m = 0.0
+        # rotate all particles at once
+        particles = grid @ quat_to_matrix(rot).T + pos
 
-                    if (fix_top and y == dim_y):
-                        m = 0.0
+        # boundary particles can be made kinematic
+        masses = np.full((dim_z + 1, dim_y + 1, dim_x + 1), mass)
 
-                    if (fix_bottom and y == 0):
-                        m = 0.0
+        if (fix_left):
+            masses[:, :, 0] = 0.0
+        if (fix_right):
+            masses[:, :, dim_x] = 0.0
+        if (fix_top):
+            masses[:, dim_y, :] = 0.0
+        if (fix_bottom):
+            masses[:, 0, :] = 0.0
 
-                    p = quat_rotate(rot, v) + pos
+        self.particle_q.extend(list(particles))
+        self.particle_qd.extend([vel] * len(particles))
+        self.particle_mass.extend(masses.ravel().tolist())
 
-                    self.add_particle(p, vel, m)
+        # first corner particle of each cell, cells ordered like the particles
+        cz, cy, cx = np.meshgrid(np.arange(dim_z), np.arange(dim_y), np.arange(dim_x), indexing='ij')
+        cx, cy, cz = cx.ravel(), cy.ravel(), cz.ravel()
 
-        # dict of open faces
-        faces = {}
-
-        def add_face(i: int, j: int, k: int):
-            key = tuple(sorted((i, j, k)))
-
-            if key not in faces:
-                faces[key] = (i, j, k)
-            else:
-                del faces[key]
+        stride_y = dim_x + 1
+        stride_z = (dim_x + 1) * (dim_y + 1)
 
-        def add_tet(i: int, j: int, k: int, l: int):
-            self.add_tetrahedron(i, j, k, l, k_mu, k_lambda, k_damp)
+        v0 = start_vertex + stride_z * cz + stride_y * cy + cx
+        v1 = v0 + 1
+        v2 = v1 + stride_z
+        v3 = v0 + stride_z
+        v4 = v0 + stride_y
+        v5 = v4 + 1
+        v6 = v5 + stride_z
+        v7 = v4 + stride_z
 
-            add_face(i, k, j)
-            add_face(j, k, l)
-            add_face(i, j, l)
-            add_face(i, l, k)
+        # five tets per cell, alternating the decomposition between neighboring cells
+        odd = ((cx ^ cy ^ cz) & 1).astype(bool)
 
-        def grid_index(x, y, z):
-            return (dim_x + 1) * (dim_y + 1) * z + (dim_x + 1) * y + x
+        tets_odd = np.stack((v0, v1, v4, v3,
+                             v2, v3, v6, v1,
+                             v5, v4, v1, v6,
+                             v7, v6, v3, v4,
+                             v4, v1, v6, v3), axis=1)
 
-        for z in range(dim_z):
-            for y in range(dim_y):
-                for x in range(dim_x):
+        tets_even = np.stack((v1, v2, v5, v0,
+                              v3, v0, v7, v2,
+                              v4, v7, v0, v5,
+                              v6, v5, v2, v7,
+                              v5, v2, v7, v0), axis=1)
 
-                    v0 = grid_index(x, y, z) + start_vertex
-                    v1 = grid_index(x + 1, y, z) + start_vertex
-                    v2 = grid_index(x + 1, y, z + 1) + start_vertex
-                    v3 = grid_index(x, y, z + 1) + start_vertex
-                    v4 = grid_index(x, y + 1, z) + start_vertex
-                    v5 = grid_index(x + 1, y + 1, z) + start_vertex
-                    v6 = grid_index(x + 1, y + 1, z + 1) + start_vertex
-                    v7 = grid_index(x, y + 1, z + 1) + start_vertex
+        tets = np.where(odd[:, None], tets_odd, tets_even).reshape(-1, 4)
 
-                    if (((x & 1) ^ (y & 1) ^ (z & 1))):
+        self._add_tets_bulk(tets, k_mu, k_lambda, k_damp)
 
-                        add_tet(v0, v1, v4, v3)
-                        add_tet(v2, v3, v6, v1)
-                        add_tet(v5, v4, v1, v6)
-                        add_tet(v7, v6, v3, v4)
-                        add_tet(v4, v1, v6, v3)
-
-                    else:
-
-                        add_tet(v1, v2, v5, v0)
-                        add_tet(v3, v0, v7, v2)
-                        add_tet(v4, v7, v0, v5)
-                        add_tet(v6, v5, v2, v7)
-                        add_tet(v5, v2, v7, v0)
-
-        # add triangles
-        for k, v in faces.items():
-            self.add_triangle(v[0], v[1], v[2])
+        # add open faces as triangles
+        self._add_triangles_bulk(_tet_open_faces(tets))
 
     def add_soft_mesh(self, pos: Vec3, rot: Quat, scale: float, vel: Vec3, vertices: List[Vec3], indices: List[int], density: float, k_mu: float, k_lambda: float, k_damp: float):
         """Helper to create a tetrahedral model from an input tetrahedral mesh
@@ -1508,56 +2254,31 @@ class ModelBuilder:
         start_vertex = len(self.particle_q)
         start_tri = len(self.tri_indices)
 
-        # dict of open faces
-        faces = {}
-
-        def add_face(i, j, k):
-            key = tuple(sorted((i, j, k)))
-
-            if key not in faces:
-                faces[key] = (i, j, k)
-            else:
-                del faces[key]
-
         # add particles
-        for v in vertices:
-
-            p = quat_rotate(rot, v * scale) + pos
+        particles = np.asarray(vertices, dtype=np.float64).reshape(-1, 3) * scale @ quat_to_matrix(rot).T + pos
 
-            self.add_particle(p, vel, 0.0)
+        self.particle_q.extend(list(particles))
+        self.particle_qd.extend([vel] * len(particles))
+        self.particle_mass.extend([0.0] * len(particles))
 
         # add tetrahedra
-        for t in range(num_tets):
-
-            v0 = start_vertex + indices[t * 4 + 0]
-            v1 = start_vertex + indices[t * 4 + 1]
-            v2 = start_vertex + indices[t * 4 + 2]
-            v3 = start_vertex + indices[t * 4 + 3]
+        tets = start_vertex + np.asarray(indices, dtype=np.int64)[:num_tets * 4].reshape(-1, 4)
 
-            volume = self.add_tetrahedron(v0, v1, v2, v3, k_mu, k_lambda, k_damp)
+        volume = self._add_tets_bulk(tets, k_mu, k_lambda, k_damp)
 
-            # distribute volume fraction to particles
-            if (volume > 0.0):
+        good = volume > 0.0
+        tets = tets[good]
 
-                self.particle_mass[v0] += density * volume / 4.0
-                self.particle_mass[v1] += density * volume / 4.0
-                self.particle_mass[v2] += density * volume / 4.0
-                self.particle_mass[v3] += density * volume / 4.0
+        # distribute volume fraction to particles
+        mass = np.array(self.particle_mass[start_vertex:], dtype=np.float64)
+        np.add.at(mass, tets.ravel() - start_vertex, np.repeat(density * volume[good] / 4.0, 4))
+        self.particle_mass[start_vertex:] = array.array('d', mass.tobytes())
 
-                # build open faces
-                add_face(v0, v2, v1)
-                add_face(v1, v2, v3)
-                add_face(v0, v1, v3)
-                add_face(v0, v3, v2)
-
-        # add triangles
-        for k, v in faces.items():
-            try:
-                self.add_triangle(v[0], v[1], v[2])
-            except np.linalg.LinAlgError:
-                continue
+        # add open faces as triangles
+        self._add_triangles_bulk(_tet_open_faces(tets), skip_singular=True)
 
-    def compute_sphere_inertia(self, density: float, r: float) -> tuple:
+    @staticmethod
+    def compute_sphere_inertia(density: float, r: float) -> tuple:
         """Helper to compute mass and inertia of a sphere
 
         Args:
@@ -1569,16 +2290,19 @@ class ModelBuilder:
             A tuple of (mass, inertia) with inertia specified around the origin
         """
 
-        v = 4.0 / 3.0 * math.pi * r * r * r
+        r2 = r * r
+
+        v = _SPHERE_VOLUME * r2 * r
 
         m = density * v
-        Ia = 2.0 / 5.0 * m * r * r
+        Ia = _SPHERE_INERTIA * m * r2
 
-        I = np.array([[Ia, 0.0, 0.0], [0.0, Ia, 0.0], [0.0, 0.0, Ia]])
+        I = np.diag((Ia, Ia, Ia))
 
         return (m, I)
 
-    def compute_capsule_inertia(self, density: float, r: float, l: float) -> tuple:
+    @staticmethod
+    def compute_capsule_inertia(density: float, r: float, l: float) -> tuple:
         """Helper to compute mass and inertia of a capsule
 
         Args:
@@ -1591,21 +2315,24 @@ class ModelBuilder:
             A tuple of (mass, inertia) with inertia specified around the origin
         """
 
-        ms = density * (4.0 / 3.0) * math.pi * r * r * r
-        mc = density * math.pi * r * r * l
+        r2 = r * r
+
+        ms = density * _SPHERE_VOLUME * r2 * r
+        mc = density * math.pi * r2 * l
 
         # total mass
         m = ms + mc
 
         # adapted from ODE
-        Ia = mc * (0.25 * r * r + (1.0 / 12.0) * l * l) + ms * (0.4 * r * r + 0.375 * r * l + 0.25 * l * l)
-        Ib = (mc * 0.5 + ms * 0.4) * r * r
+        Ia = mc * (0.25 * r2 + (1.0 / 12.0) * l * l) + ms * (_SPHERE_INERTIA * r2 + 0.375 * r * l + 0.25 * l * l)
+        Ib = (mc * 0.5 + ms * _SPHERE_INERTIA) * r2
 
-        I = np.array([[Ib, 0.0, 0.0], [0.0, Ia, 0.0], [0.0, 0.0, Ia]])
+        I = np.diag((Ib, Ia, Ia))
 
         return (m, I)
 
-    def compute_box_inertia(self, density: float, w: float, h: float, d: float) -> tuple:
+    @staticmethod
+    def compute_box_inertia(density: float, w: float, h: float, d: float) -> tuple:
         """Helper to compute mass and inertia of a box
 
         Args:
@@ -1626,7 +2353,7 @@ class ModelBuilder:
         Ib = 1.0 / 12.0 * m * (w * w + d * d)
         Ic = 1.0 / 12.0 * m * (w * w + h * h)
 
-        I = np.array([[Ia, 0.0, 0.0], [0.0, Ib, 0.0], [0.0, 0.0, Ic]])
+        I = np.diag((Ia, Ib, Ic))
 
         return (m, I)
 
@@ -1648,7 +2375,7 @@ class ModelBuilder:
 
     
     # incrementally updates rigid body mass with additional mass and inertia expressed at a local to the body
-    def _update_body_mass(self, i, m, I, p, q):
+    def _update_body_mass(self, i, m, I, p, R):
         
         if (i == -1):
             return
@@ -1665,8 +2392,8 @@ class ModelBuilder:
         com_offset = new_com - self.body_com[i]
         shape_offset = new_com - p
 
-        new_inertia = transform_inertia(self.body_mass[i], self.body_inertia[i], com_offset, quat_identity()) + transform_inertia(
-            m, I, shape_offset, q)
+        new_inertia = transform_inertia_matrix(self.body_mass[i], self.body_inertia[i], com_offset, _I3) + transform_inertia_matrix(
+            m, I, shape_offset, R)
 
         self.body_mass[i] = new_mass
         self.body_inertia[i] = new_inertia
@@ -1696,6 +2423,7 @@ class ModelBuilder:
         assert (len(self.cut_edge_coords) == 0)
 
         import tqdm
+        from cutting.utils import MeshTopology
         # top = MeshTopology(tet_indices)
         # self.tet_edge_indices = list(eid for eid in top.unique_edges)
         # return
@@ -1704,77 +2432,64 @@ class ModelBuilder:
         print("particles before cut:", len(X))
         # maps intersected edge to index in self.cut_edge_coords
         edge_intersections = dict()
-        tet_indices_here = copy(tet_indices)
 
         surface = surface_triangles
-        surface_min = surface[0][0]
-        surface_max = surface[0][0]
+        surface_x = np.asarray(surface, dtype=np.float64).reshape(-1, 3, 3)
         # compute bounding box of cutting surface
-        for tri in surface_triangles:
-            for p in tri:
-                surface_min = np.min([surface_min, p], axis=0)
-                surface_max = np.max([surface_max, p], axis=0)
-
-        def edge_intersects_bounds(edge):
-            return max(edge[0][0], edge[1][0]) >= surface_min[0] \
-                and surface_max[0] >= min(edge[0][0], edge[1][0]) \
-                and max(edge[0][1], edge[1][1]) >= surface_min[1] \
-                and surface_max[1] >= min(edge[0][1], edge[1][1]) \
-                and max(edge[0][2], edge[1][2]) >= surface_min[2] \
-                and surface_max[2] >= min(edge[0][2], edge[1][2])
-
-        def is_above_triangle(point, tri):
-            shape = np.matrix((tri[1] - tri[0], tri[2] - tri[0], point - tri[0]))
-            return np.linalg.det(shape) > 0
-
-        def edge_intersects_tri(edge, tri, tol=1e-8):
-            # Möller–Trumbore algorithm
-            edge1 = tri[1] - tri[0]
-            edge2 = tri[2] - tri[0]
-            direction = edge[1] - edge[0]
-            h = np.cross(direction, edge2)
-            a = np.dot(edge1, h)
-            if -tol < a < tol:
-                # ray is parallel to tri
-                return None
-            f = 1.0 / a
-            s = edge[0] - tri[0]
-            u = f * np.dot(s, h)
-            if u < -tol or u > 1.0 + tol:
-                return None
-            q = np.cross(s, edge1)
-            v = f * np.dot(direction, q)
-            if v < -tol or u + v > 1.0 + tol:
-                return None
-            # compute t to find intersection point
-            t = f * np.dot(edge2, q)
-            if t < -tol or t > 1.0 + tol:
-                return None
-            return t
-
-        def canonical(indices):
-            return tuple(sorted(indices))
+        surface_min = surface_x.reshape(-1, 3).min(axis=0)
+        surface_max = surface_x.reshape(-1, 3).max(axis=0)
+
+        # edges and normals of the cutting surface triangles
+        surface_e1 = surface_x[:, 1] - surface_x[:, 0]
+        surface_e2 = surface_x[:, 2] - surface_x[:, 0]
+        surface_normal = np.cross(surface_e1, surface_e2)
+        surface_normal_unit = surface_normal / np.linalg.norm(surface_normal, axis=1, keepdims=True)
+
+        def is_above_triangle(point, tri_id):
+            # scalar triple product of the triangle edges and the point relative to the triangle
+            return np.dot(surface_normal[tri_id], point - surface_x[tri_id, 0]) > 0
+
+        def edge_key(i, j):
+            # packs an undirected edge into a single integer
+            i, j = int(i), int(j)
+            return (i << 32) | j if i < j else (j << 32) | i
+
+        def face_key(face):
+            # packs an unordered triangle into a single integer
+            a, b, c = int(face[0]), int(face[1]), int(face[2])
+            if a > b:
+                a, b = b, a
+            if b > c:
+                b, c = c, b
+            if a > b:
+                a, b = b, a
+            return (a << 64) | (b << 32) | c
+
+        # source particles of the duplicated vertices, these are added in one batch once all intersections are known
+        copied_from = []
 
         def copy_vertex(id):
-            new_id = len(self.particle_q)
-            self.particle_q.append(copy(self.particle_q[id]))
-            self.particle_qd.append(copy(self.particle_qd[id]))
-            self.particle_mass.append(copy(self.particle_mass[id]))
+            new_id = len(self.particle_q) + len(copied_from)
+            copied_from.append(id)
             return new_id
 
         def copy_tet(id, new_indices):
             new_id = len(tet_indices)
-            tet_indices.append(copy(new_indices))
-            tet_indices_here.append(copy(new_indices))
-            self.tet_poses.append(copy(self.tet_poses[id]))
-            self.tet_activations.append(copy(self.tet_activations[id]))
-            self.tet_mu.append(copy(self.tet_mu[id]))
-            self.tet_lambda.append(copy(self.tet_lambda[id]))
-            self.tet_damping.append(copy(self.tet_damping[id]))
+            # the duplicated tet shares the (never modified) parameters of the original tet
+            tet_indices.append(new_indices)
+            # register the edges of the new tet, the edges of the tets modified in place are kept since
+            # the topology after the cut is that of the original tets plus the duplicated ones
+            for edge in MeshTopology.edge_indices(new_indices):
+                top.unique_edges[edge] = None
+            self.tet_poses.append(self.tet_poses[id])
+            self.tet_activations.append(self.tet_activations[id])
+            self.tet_mu.append(self.tet_mu[id])
+            self.tet_lambda.append(self.tet_lambda[id])
+            self.tet_damping.append(self.tet_damping[id])
             return new_id
 
         def add_edge_intersection(i, j, t, p):
-            eis = canonical((i, j))
+            eis = edge_key(i, j)
             vid = len(self.cut_edge_coords)
             # store i, j in original order to ensure the barycentric coordinate t matches
             self.cut_edge_indices.append((i, j))
@@ -1787,10 +2502,10 @@ class ModelBuilder:
 
         # counts of intersecting edges per tet
         intersections_per_tet = defaultdict(int)
-        # IDs vertices that are above the surface
-        above_surface = set()
-        # mapping of vertices to duplicated vertices below the cut
-        new_vs = dict()
+        # flags of vertices that are above the surface, indexed by vertex ID (duplicated vertices included)
+        above_surface = bytearray(2 * len(X))
+        # mapping of vertices to duplicated vertices below the cut, -1 if the vertex has not been duplicated
+        new_vs = [-1] * len(X)
         # intersecting edges with indices as they were before the topological cut
         affected_edges = set()
         # normals of cutting surface per edge
@@ -1800,80 +2515,143 @@ class ModelBuilder:
 
         top = MeshTopology(tet_indices)
         surface_edges = top.surface_edges()
-        for eis in top.unique_edges.keys():
-            edge = (X[eis[0]], X[eis[1]])
-            if not edge_intersects_bounds(edge):
+
+        # test all edges within the bounds of the cutting surface against all of its triangles at once
+        unique_edges = list(top.unique_edges.keys())
+        edge_x = self._particle_q_array()[np.array(unique_edges, dtype=np.int64).reshape(-1, 2)]
+
+        in_bounds = np.all((np.maximum(edge_x[:, 0], edge_x[:, 1]) >= surface_min) &
+                           (np.minimum(edge_x[:, 0], edge_x[:, 1]) <= surface_max), axis=1)
+
+        candidate_edges = [unique_edges[i] for i in np.flatnonzero(in_bounds)]
+        candidate_x = edge_x[in_bounds]
+
+        if numba is not None and len(candidate_x) * len(surface_x) >= EDGE_TRI_NUMBA_THRESHOLD:
+            find_intersections = _edge_tri_intersections_numba
+        else:
+            find_intersections = _edge_tri_intersections
+
+        hit_tri, hit_t = find_intersections(np.ascontiguousarray(candidate_x[:, 0]),
+                                            candidate_x[:, 1] - candidate_x[:, 0],
+                                            surface_x)
+
+        for eis, tri_id, t in zip(candidate_edges, hit_tri, hit_t):
+            if tri_id < 0:
                 continue
-            for tri in surface:
-                t = edge_intersects_tri(edge, tri)
-                if t is None:
-                    continue
-                if verbose:
-                    print("Edge", eis, "intersects at t =", t)
-                affected_edges.add(eis)
-
-                if eis[0] not in new_vs:
-                    new_vs[eis[0]] = copy_vertex(eis[0])
-                    self.contactless_particles.add(new_vs[eis[0]])
-                if eis[1] not in new_vs:
-                    new_vs[eis[1]] = copy_vertex(eis[1])
-                    self.contactless_particles.add(new_vs[eis[1]])
-
-                for tet_id in top.elements_per_edge[eis]:
-                    intersections_per_tet[tet_id] += 1
-
-                # li = add_edge_intersection(eis[0], new_vs[eis[1]], t, p)
-                # ri = add_edge_intersection(new_vs[eis[0]], eis[1], t, p)
-                # self.cut_spring_indices.append((li, ri))
-
-                tri_normal = compute_normal(tri)
-                cut_normals[canonical((eis[0], new_vs[eis[1]]))] = tri_normal
-                cut_normals[canonical((new_vs[eis[0]], eis[1]))] = tri_normal
-                self.cut_spring_normal.append(tri_normal / np.linalg.norm(tri_normal))
-
-                p = (1.0 - t) * edge[0] + t * edge[1]
-                if is_above_triangle(edge[0], tri):
-                    above_surface.add(eis[0])
-                    above_surface.add(new_vs[eis[0]])
-                    # edge[0] is always the side connected to the mesh, i.e. opposite to cutting surface
-                    li = add_edge_intersection(eis[0], new_vs[eis[1]], t, p)
-                    ri = add_edge_intersection(new_vs[eis[0]], eis[1], t, p)
-                else:
-                    above_surface.add(eis[1])
-                    above_surface.add(new_vs[eis[1]])
-                    # edge[0] is always the side connected to the mesh, i.e. opposite to cutting surface
-                    li = add_edge_intersection(eis[1], new_vs[eis[0]], 1. - t, p)
-                    ri = add_edge_intersection(new_vs[eis[1]], eis[0], 1. - t, p)
-                self.cut_spring_indices.append((li, ri))
-                # XXX now each spring has contact parameters
-                if eis in surface_edges:
-                    self.sdf_ke.append(surface_contact_ke)
-                    self.sdf_kd.append(surface_contact_kd)
-                    self.sdf_kf.append(surface_contact_kf)
-                    self.sdf_mu.append(surface_contact_mu)
-                    self.cut_spring_rest_length.append(surface_cut_spring_rest_length)
-                    self.cut_spring_stiffness.append(surface_cut_spring_ke)
-                    self.cut_spring_damping.append(surface_cut_spring_kd)
-                    self.cut_spring_softness.append(surface_cut_spring_softness)
-                else:
-                    self.sdf_ke.append(contact_ke)
-                    self.sdf_kd.append(contact_kd)
-                    self.sdf_kf.append(contact_kf)
-                    self.sdf_mu.append(contact_mu)
-                    self.cut_spring_rest_length.append(cut_spring_rest_length)
-                    self.cut_spring_stiffness.append(cut_spring_ke)
-                    self.cut_spring_damping.append(cut_spring_kd)
-                    self.cut_spring_softness.append(cut_spring_softness)
-
-                # we have found an intersection for this edge
-                break
+            edge = (X[eis[0]], X[eis[1]])
+            if verbose:
+                print("Edge", eis, "intersects at t =", t)
+            affected_edges.add(eis)
+
+            if new_vs[eis[0]] < 0:
+                new_vs[eis[0]] = copy_vertex(eis[0])
+                self.contactless_particles.add(new_vs[eis[0]])
+            if new_vs[eis[1]] < 0:
+                new_vs[eis[1]] = copy_vertex(eis[1])
+                self.contactless_particles.add(new_vs[eis[1]])
+
+            for tet_id in top.elements_per_edge[eis]:
+                intersections_per_tet[tet_id] += 1
+
+            # li = add_edge_intersection(eis[0], new_vs[eis[1]], t, p)
+            # ri = add_edge_intersection(new_vs[eis[0]], eis[1], t, p)
+            # self.cut_spring_indices.append((li, ri))
+
+            tri_normal = surface_normal[tri_id]
+            cut_normals[edge_key(eis[0], new_vs[eis[1]])] = tri_normal
+            cut_normals[edge_key(new_vs[eis[0]], eis[1])] = tri_normal
+            self.cut_spring_normal.append(surface_normal_unit[tri_id])
+
+            p = (1.0 - t) * edge[0] + t * edge[1]
+            if is_above_triangle(edge[0], tri_id):
+                above_surface[eis[0]] = True
+                above_surface[new_vs[eis[0]]] = True
+                # edge[0] is always the side connected to the mesh, i.e. opposite to cutting surface
+                li = add_edge_intersection(eis[0], new_vs[eis[1]], t, p)
+                ri = add_edge_intersection(new_vs[eis[0]], eis[1], t, p)
+            else:
+                above_surface[eis[1]] = True
+                above_surface[new_vs[eis[1]]] = True
+                # edge[0] is always the side connected to the mesh, i.e. opposite to cutting surface
+                li = add_edge_intersection(eis[1], new_vs[eis[0]], 1. - t, p)
+                ri = add_edge_intersection(new_vs[eis[1]], eis[0], 1. - t, p)
+            self.cut_spring_indices.append((li, ri))
+            # XXX now each spring has contact parameters
+            if eis in surface_edges:
+                self.sdf_ke.append(surface_contact_ke)
+                self.sdf_kd.append(surface_contact_kd)
+                self.sdf_kf.append(surface_contact_kf)
+                self.sdf_mu.append(surface_contact_mu)
+                self.cut_spring_rest_length.append(surface_cut_spring_rest_length)
+                self.cut_spring_stiffness.append(surface_cut_spring_ke)
+                self.cut_spring_damping.append(surface_cut_spring_kd)
+                self.cut_spring_softness.append(surface_cut_spring_softness)
+            else:
+                self.sdf_ke.append(contact_ke)
+                self.sdf_kd.append(contact_kd)
+                self.sdf_kf.append(contact_kf)
+                self.sdf_mu.append(contact_mu)
+                self.cut_spring_rest_length.append(cut_spring_rest_length)
+                self.cut_spring_stiffness.append(cut_spring_ke)
+                self.cut_spring_damping.append(cut_spring_kd)
+                self.cut_spring_softness.append(cut_spring_softness)
+
+        self._copy_particles(copied_from)
 
         print("particles after cut (cut_vertex_offset):", len(X))
         # index after which the added intersection vertices are added in the visualization nodes
         cut_vertex_offset = len(X)
         cut_tets = set(self.cut_tets)
         intersected_tris = set()
-        original_tri_indices = {canonical(tri): i for i, tri in enumerate(self.tri_indices)}
+        original_tri_indices = {face_key(tri): i for i, tri in enumerate(self.tri_indices)}
+
+        # cut polygons (vertex indices, positions, normal, above), triangulated in one batch once all tets are cut
+        pending_polygons = []
+
+        def triangulate_poly(polygon, normal, above):
+            # triangulate polygons with 3 or 4 vertices
+            if not (3 <= len(polygon) <= 4):
+                return
+            pending_polygons.append((list(polygon.keys()), list(polygon.values()), normal, above))
+
+        def add_polygons(tet, above):
+            cut_polygon = OrderedDict()  # polygon at cutting interface
+            avg_normal = np.zeros(3)
+            for face in MeshTopology.face_indices(tet):
+                polygon = OrderedDict()  # cut face polygon of tet
+                for a, b in ((face[0], face[1]), (face[1], face[2]), (face[2], face[0])):
+                    eid = edge_key(a, b)
+                    if eid in cut_normals:
+                        avg_normal = cut_normals[eid]
+                    edge_is_cut = eid in edge_intersections
+                    above_a = above_surface[a]
+                    above_b = above_surface[b]
+                    if not above:
+                        above_a = not above_a
+                        above_b = not above_b
+                    if not above_a and not above_b:
+                        continue
+                    if above_a and above_b:
+                        polygon[a] = X[a]
+                        polygon[b] = X[b]
+                    else:
+                        if not edge_is_cut:
+                            if verbose:
+                                print("Warning: no intersection information for edge (%i,%i)" % (a, b), file=sys.stderr)
+                            polygon[a] = X[a]
+                            polygon[b] = X[b]
+                            continue
+                        p, ab = edge_intersections[eid]
+                        if above_a:
+                            polygon[a] = X[a]
+                            polygon[cut_vertex_offset + ab] = p
+                        else:
+                            polygon[cut_vertex_offset + ab] = p
+                            polygon[b] = X[b]
+                        cut_polygon[cut_vertex_offset + ab] = p
+                if face in boundary_normals:
+                    triangulate_poly(polygon, boundary_normals[face], above)
+            triangulate_poly(cut_polygon, avg_normal if above else -avg_normal, above)
 
         if verbose:
             progress = affected_edges
@@ -1892,29 +2670,32 @@ class ModelBuilder:
 
                 # tet where vertices above cut remain fixed
                 tet_above = (
-                    tet[0] if tet[0] in above_surface else new_vs[tet[0]],
-                    tet[1] if tet[1] in above_surface else new_vs[tet[1]],
-                    tet[2] if tet[2] in above_surface else new_vs[tet[2]],
-                    tet[3] if tet[3] in above_surface else new_vs[tet[3]],
+                    tet[0] if above_surface[tet[0]] else new_vs[tet[0]],
+                    tet[1] if above_surface[tet[1]] else new_vs[tet[1]],
+                    tet[2] if above_surface[tet[2]] else new_vs[tet[2]],
+                    tet[3] if above_surface[tet[3]] else new_vs[tet[3]],
                 )
                 # newly added tet where vertices below cut remain fixed
                 tet_below = (
-                    new_vs[tet[0]] if tet[0] in above_surface else tet[0],
-                    new_vs[tet[1]] if tet[1] in above_surface else tet[1],
-                    new_vs[tet[2]] if tet[2] in above_surface else tet[2],
-                    new_vs[tet[3]] if tet[3] in above_surface else tet[3],
+                    new_vs[tet[0]] if above_surface[tet[0]] else tet[0],
+                    new_vs[tet[1]] if above_surface[tet[1]] else tet[1],
+                    new_vs[tet[2]] if above_surface[tet[2]] else tet[2],
+                    new_vs[tet[3]] if above_surface[tet[3]] else tet[3],
                 )
+                # all vertices of a fully cut tet have been duplicated
+                assert (min(tet_above) >= 0 and min(tet_below) >= 0)
 
                 # store previous boundary triangle normals
                 tet_tri_indices = MeshTopology.face_indices(tet)
                 above_tris = MeshTopology.face_indices(tet_above)
                 below_tris = MeshTopology.face_indices(tet_below)
                 for orig_tri, above_tri, below_tri in zip(tet_tri_indices, above_tris, below_tris):
-                    if orig_tri not in original_tri_indices:
+                    orig_key = face_key(orig_tri)
+                    if orig_key not in original_tri_indices:
                         continue
                     # we have a boundary triangle
-                    intersected_tris.add(orig_tri)
-                    tri_idx = self.tri_indices[original_tri_indices[orig_tri]]
+                    intersected_tris.add(orig_key)
+                    tri_idx = self.tri_indices[original_tri_indices[orig_key]]
                     tri = (X[tri_idx[0]], X[tri_idx[1]], X[tri_idx[2]])
                     normal = compute_normal(tri)
                     boundary_normals[above_tri] = normal
@@ -1928,120 +2709,74 @@ class ModelBuilder:
                 tet_below_id = copy_tet(tet_id, tet_below)
                 cut_tets.add(tet_below_id)
 
-                def insert_tri(tri, tri_indices, normal, above):
-                    # whether the vertices are only represented by hard particles
-                    nx = len(self.particle_q)
-                    is_only_virtual = all(np.array(tri_indices) >= nx)
-                    if verbose:
-                        print("Inserting triangle", tri_indices, " - cutoff:", nx)
-                    # insert cutting triangle with correct winding number so the triangle normal
-                    # points in direction of the provided normal
-                    if np.dot(compute_normal(tri), normal) > 0:
-                        self.cut_tri_indices.append(tri_indices)
-                        if is_only_virtual:
-                            if verbose:
-                                print("Add virtual-only triangle", tri_indices, "with normal", normal)
-                            self.cut_virtual_tri_indices.append(np.array(tri_indices) - nx)
-                            if above:
-                                self.cut_virtual_tri_indices_above_cut.append(np.array(tri_indices) - nx)
-                            else:
-                                self.cut_virtual_tri_indices_below_cut.append(np.array(tri_indices) - nx)
-                    else:
-                        self.cut_tri_indices.append(tri_indices[::-1])
-                        if is_only_virtual:
-                            if verbose:
-                                print("Add FLIPPED virtual-only triangle", tri_indices[::-1], "with normal", normal)
-                            self.cut_virtual_tri_indices.append(np.array(tri_indices[::-1]) - nx)
-                            if above:
-                                self.cut_virtual_tri_indices_above_cut.append(np.array(tri_indices[::-1]) - nx)
-                            else:
-                                self.cut_virtual_tri_indices_below_cut.append(np.array(tri_indices[::-1]) - nx)
-
-                def triangulate_poly(polygon, normal, above):
-                    # triangulate polygons with 3 or 4 vertices
-                    if len(polygon) == 0:
-                        return
-                    if not (3 <= len(polygon) <= 4):
-                        return
-                    assert (3 <= len(polygon) <= 4)
-                    if verbose:
-                        print("Triangulate with normal =", normal)
-                    idxs = list(polygon.keys())
-                    vecs = list(polygon.values())
-                    if len(polygon) == 3:
-                        insert_tri(vecs, idxs, normal, above)
-                        return
-                    assert (len(polygon) == 4)
-                    # consider 3 cases of triangulation:
-                    # 1. (0, 1, 2) and (0, 2, 3)
-                    # 2. (0, 1, 2) and (0, 1, 3)
-                    # 3. (0, 1, 3) and (0, 2, 3)
-                    v1 = vecs[1] - vecs[0]
-                    v2 = vecs[2] - vecs[0]
-                    v3 = vecs[3] - vecs[0]
-                    if np.dot(np.cross(v2, v3), np.cross(v1, v2)) > 0.0:
-                        # case 1
-                        insert_tri(vecs[:3], idxs[:3], normal, above)
-                        insert_tri((vecs[0], vecs[2], vecs[3]), (idxs[0], idxs[2], idxs[3]), normal, above)
-                    elif np.dot(np.cross(v1, v2), np.cross(v3, v1)) > 0.0:
-                        # case 2
-                        insert_tri(vecs[:3], idxs[:3], normal, above)
-                        insert_tri((vecs[0], vecs[1], vecs[3]), (idxs[0], idxs[1], idxs[3]), normal, above)
-                    else:
-                        # case 3
-                        insert_tri((vecs[0], vecs[1], vecs[3]), (idxs[0], idxs[1], idxs[3]), normal, above)
-                        insert_tri((vecs[0], vecs[2], vecs[3]), (idxs[0], idxs[2], idxs[3]), normal, above)
-
-                def add_polygons(tet, above):
-                    cut_polygon = OrderedDict()  # polygon at cutting interface
-                    avg_normal = np.zeros(3)
-                    for face in MeshTopology.face_indices(tet):
-                        polygon = OrderedDict()  # cut face polygon of tet
-                        for a, b in ((face[0], face[1]), (face[1], face[2]), (face[2], face[0])):
-                            eid = canonical((a, b))
-                            if eid in cut_normals:
-                                avg_normal = cut_normals[eid]
-                            edge_is_cut = eid in edge_intersections
-                            above_a = a in above_surface
-                            above_b = b in above_surface
-                            if not above:
-                                above_a = not above_a
-                                above_b = not above_b
-                            if not above_a and not above_b:
-                                continue
-                            if above_a and above_b:
-                                polygon[a] = X[a]
-                                polygon[b] = X[b]
-                            else:
-                                if not edge_is_cut:
-                                    if verbose:
-                                        print("Warning: no intersection information for edge (%i,%i)" % (a, b), file=sys.stderr)
-                                    polygon[a] = X[a]
-                                    polygon[b] = X[b]
-                                    continue
-                                p, ab = edge_intersections[eid]
-                                if above_a:
-                                    polygon[a] = X[a]
-                                    polygon[cut_vertex_offset + ab] = p
-                                else:
-                                    polygon[cut_vertex_offset + ab] = p
-                                    polygon[b] = X[b]
-                                cut_polygon[cut_vertex_offset + ab] = p
-                        if face in boundary_normals:
-                            triangulate_poly(polygon, boundary_normals[face], above)
-                    triangulate_poly(cut_polygon, avg_normal if above else -avg_normal, above)
-
                 # triangulate intersecting tets (faces, cutting interface)
                 add_polygons(tet_above, True)
                 add_polygons(tet_below, False)
 
+        if pending_polygons:
+            # whether the vertices are only represented by hard particles
+            nx = len(self.particle_q)
+
+            count = len(pending_polygons)
+            poly_indices = np.zeros((count, 4), dtype=np.int64)
+            poly_x = np.zeros((count, 4, 3))
+            poly_normal = np.zeros((count, 3))
+            poly_above = np.zeros(count, dtype=bool)
+            is_quad = np.zeros(count, dtype=bool)
+
+            for k, (idxs, vecs, normal, above) in enumerate(pending_polygons):
+                poly_indices[k, :len(idxs)] = idxs
+                poly_x[k, :len(vecs)] = vecs
+                poly_normal[k] = normal
+                poly_above[k] = above
+                is_quad[k] = len(idxs) == 4
+
+            # consider 3 cases of triangulation for quads:
+            # 1. (0, 1, 2) and (0, 2, 3)
+            # 2. (0, 1, 2) and (0, 1, 3)
+            # 3. (0, 1, 3) and (0, 2, 3)
+            v1 = poly_x[:, 1] - poly_x[:, 0]
+            v2 = poly_x[:, 2] - poly_x[:, 0]
+            v3 = poly_x[:, 3] - poly_x[:, 0]
+            c12 = np.cross(v1, v2)
+            case1 = np.einsum('ij,ij->i', np.cross(v2, v3), c12) > 0.0
+            case2 = ~case1 & (np.einsum('ij,ij->i', c12, np.cross(v3, v1)) > 0.0)
+
+            first = np.where((~is_quad | case1 | case2)[:, None], (0, 1, 2), (0, 1, 3))
+            second = np.where(case2[:, None], (0, 1, 3), (0, 2, 3))
+
+            # triangles in order of insertion, triangles have no second element
+            corners = np.stack((first, second), axis=1).reshape(-1, 3)
+            poly_id = np.repeat(np.arange(count), 2)
+            valid = np.stack((np.ones(count, dtype=bool), is_quad), axis=1).reshape(-1)
+            corners, poly_id = corners[valid], poly_id[valid]
+
+            tri_indices = poly_indices[poly_id[:, None], corners]
+            tri_x = poly_x[poly_id[:, None], corners]
+
+            # insert cutting triangles with correct winding number so the triangle normal
+            # points in direction of the provided normal
+            tri_normal = np.cross(tri_x[:, 1] - tri_x[:, 0], tri_x[:, 2] - tri_x[:, 0])
+            flip = ~(np.einsum('ij,ij->i', tri_normal, poly_normal[poly_id]) > 0.0)
+            tri_indices = np.where(flip[:, None], tri_indices[:, ::-1], tri_indices)
+
+            if verbose:
+                print("Triangulated", count, "cut polygons into", len(tri_indices), "triangles - cutoff:", nx)
+
+            self.cut_tri_indices.extend(map(tuple, tri_indices.tolist()))
+
+            is_only_virtual = np.all(tri_indices >= nx, axis=1)
+            tri_above = poly_above[poly_id]
+            self.cut_virtual_tri_indices.extend(tri_indices[is_only_virtual] - nx)
+            self.cut_virtual_tri_indices_above_cut.extend(tri_indices[is_only_virtual & tri_above] - nx)
+            self.cut_virtual_tri_indices_below_cut.extend(tri_indices[is_only_virtual & ~tri_above] - nx)
+
         self.cut_tets = list(cut_tets)
         # remove previous intersecting faces for this tet
-        self.tri_indices = [tri for tri in self.tri_indices if canonical(tri) not in intersected_tris]
-        top = MeshTopology(tet_indices_here)
-        self.tet_edge_indices = list(eid for eid in top.unique_edges if eid not in edge_intersections)
+        self.tri_indices = [tri for tri in self.tri_indices if face_key(tri) not in intersected_tris]
+        self.tet_edge_indices = list(eid for eid in top.unique_edges if edge_key(*eid) not in edge_intersections)
 
-        self.cut_duplicated_x = new_vs
+        self.cut_duplicated_x = {i: j for i, j in enumerate(new_vs) if j >= 0}
 
     # cuts the tets by the triangular surface, duplicating intersecting tets, inserting vertices on intersecting edges,
     # and adding springs between former and duplicated vertices
@@ -2104,17 +2839,14 @@ class ModelBuilder:
 
                 self.contactless_particles = set(mc.contactless_particles)
 
-                # new_id starts from the previous number of particle_q
-                for new_id, old_id in mc.vertex_copy_from.items():
-                    self.particle_qd.append(copy(self.particle_qd[old_id]))
-                    self.particle_mass.append(copy(self.particle_mass[old_id]))
+                # original IDs of the copies, new IDs start from the previous number of particle_q
+                vertex_copy_from = np.asarray(mc.vertex_copy_from, dtype=np.int64)
+                self.particle_qd.extend(list(np.asarray(self.particle_qd, dtype=np.float64).reshape(-1, 3)[vertex_copy_from]))
+                self.particle_mass.extend(np.array(self.particle_mass)[vertex_copy_from].tolist())
                 # same for tet IDs
-                for new_id, old_id in mc.tet_copy_from.items():
-                    self.tet_poses.append(copy(self.tet_poses[old_id]))
-                    self.tet_activations.append(copy(self.tet_activations[old_id]))
-                    self.tet_mu.append(copy(self.tet_mu[old_id]))
-                    self.tet_lambda.append(copy(self.tet_lambda[old_id]))
-                    self.tet_damping.append(copy(self.tet_damping[old_id]))
+                tet_copy_from = np.asarray(mc.tet_copy_from, dtype=np.int64)
+                for values in (self.tet_poses, self.tet_activations, self.tet_mu, self.tet_lambda, self.tet_damping):
+                    values.extend(np.asarray(values)[tet_copy_from].tolist())
 
                 # remove previous intersecting faces for this tet
                 self.tri_indices = np.array(mc.tri_indices)
@@ -2124,24 +2856,18 @@ class ModelBuilder:
                 assert (len(self.tet_indices) == len(self.tet_mu))
 
                 num_springs = len(self.cut_spring_indices)
-                surface_springs = np.array(mc.cut_spring_indices_surface)
-                self.sdf_ke = np.repeat(contact_ke, num_springs)
-                self.sdf_ke[surface_springs] = surface_contact_ke
-                self.sdf_kd = np.repeat(contact_kd, num_springs)
-                self.sdf_kd[surface_springs] = surface_contact_kd
-                self.sdf_kf = np.repeat(contact_kf, num_springs)
-                self.sdf_kf[surface_springs] = surface_contact_kf
-                self.sdf_mu = np.repeat(contact_mu, num_springs)
-                self.sdf_mu[surface_springs] = surface_contact_mu
-
-                self.cut_spring_rest_length = np.repeat(cut_spring_rest_length, num_springs)
-                self.cut_spring_rest_length[surface_springs] = surface_cut_spring_rest_length
-                self.cut_spring_stiffness = np.repeat(cut_spring_ke, num_springs)
-                self.cut_spring_stiffness[surface_springs] = surface_cut_spring_ke
-                self.cut_spring_damping = np.repeat(cut_spring_kd, num_springs)
-                self.cut_spring_damping[surface_springs] = surface_cut_spring_kd
-                self.cut_spring_softness = np.repeat(cut_spring_softness, num_springs)
-                self.cut_spring_softness[surface_springs] = surface_cut_spring_softness
+                surface_springs = np.array(mc.cut_spring_indices_surface, dtype=np.int64)
+
+                # contact and spring parameters of all cut springs in one float64 buffer, one row per parameter
+                params = np.empty((8, num_springs), dtype=np.float64)
+                params[:] = np.array((contact_ke, contact_kd, contact_kf, contact_mu,
+                                      cut_spring_rest_length, cut_spring_ke, cut_spring_kd, cut_spring_softness), dtype=np.float64)[:, None]
+                params[:, surface_springs] = np.array((surface_contact_ke, surface_contact_kd, surface_contact_kf, surface_contact_mu,
+                                                       surface_cut_spring_rest_length, surface_cut_spring_ke, surface_cut_spring_kd, surface_cut_spring_softness), dtype=np.float64)[:, None]
+
+                (self.sdf_ke, self.sdf_kd, self.sdf_kf, self.sdf_mu,
+                 self.cut_spring_rest_length, self.cut_spring_stiffness, self.cut_spring_damping, self.cut_spring_softness) = params
+
                 self.cut_tets = np.array(mc.intersected_tets())
 
                 self.cut_duplicated_x = mc.duplicated_x
@@ -2174,8 +2900,20 @@ class ModelBuilder:
 
         print(f'{len(self.cut_spring_indices)} cut springs have been inserted.')
 
+    def _finalize(self) -> dict:
+        """Materializes the per-element float fields once as float32 arrays, the precision they are simulated in"""
+
+        fields = ('particle_q', 'particle_qd',
+                  'spring_rest_length', 'spring_stiffness', 'spring_damping', 'spring_control',
+                  'tri_poses', 'tri_activations',
+                  'edge_rest_angle',
+                  'tet_poses', 'tet_activations', 'tet_mu', 'tet_lambda', 'tet_damping',
+                  'shape_geo_scale')
+
+        return {name: np.asarray(getattr(self, name), dtype=np.float32) for name in fields}
+
     # returns a (model, state) pair given the description
-    def finalize(self, adapter: str, knife = None, minimum_mass=0.0, requires_grad=True) -> Model:
+    def finalize(self, adapter: str, knife = None, minimum_mass=0.0, requires_grad=True, verbose=False) -> Model:
         """Convert this builder object to a concrete model for simulation.
 
         After building simulation elements this method should be called to transfer
@@ -2183,81 +2921,90 @@ class ModelBuilder:
 
         Args:
             adapter: The simulation adapter to use, e.g.: 'cpu', 'cuda'
+            verbose: Print the sizes of the cut element arrays
 
         Returns:
 
             A model object.
+
+        Note:
+
+            Finalizing allocates many small device tensors, for CUDA adapters running
+            with ``PYTORCH_CUDA_ALLOC_CONF=expandable_segments:True`` reduces the
+            fragmentation of the caching allocator this causes.
         """
 
+        particle_mass = np.array(self.particle_mass, dtype=np.float64)
+
         if minimum_mass > 0.0:
-            for i in range(len(self.particle_mass)):
-                if (self.particle_mass[i] > 0.0):
-                    self.particle_mass[i] = max(minimum_mass, self.particle_mass[i])
+            np.maximum(particle_mass, minimum_mass, out=particle_mass, where=particle_mass > 0.0)
+            self.particle_mass[:] = array.array('d', particle_mass.tobytes())
+
         # construct particle inv masses
-        particle_inv_mass = []
-        for m in self.particle_mass:
-            if (m > 0.0):
-                particle_inv_mass.append(1.0 / m)
-            else:
-                particle_inv_mass.append(0.0)
+        particle_inv_mass = np.divide(1.0, particle_mass, out=np.zeros_like(particle_mass), where=particle_mass > 0.0)
+
+        host = self._finalize()
 
         #-------------------------------------
         # construct Model (non-time varying) data
 
         m = Model(adapter)
 
+        # arrays are collected here and transferred to the adapter at the end
+        upload = _Uploader(m, adapter)
+
         #---------------------        
         # particles
 
         # state (initial)
-        m.particle_q = torch.tensor(self.particle_q, dtype=torch.float32, device=adapter)
-        m.particle_qd = torch.tensor(self.particle_qd, dtype=torch.float32, device=adapter)
+        upload.add('particle_q', host['particle_q'], np.float32)
+        upload.add('particle_qd', host['particle_qd'], np.float32)
 
         # model 
-        m.particle_mass = torch.tensor(self.particle_mass, dtype=torch.float32, device=adapter)
-        m.particle_inv_mass = torch.tensor(particle_inv_mass, dtype=torch.float32, device=adapter)
+        upload.add('particle_mass', particle_mass, np.float32)
+        upload.add('particle_inv_mass', particle_inv_mass, np.float32)
 
         #---------------------
         # collision geometry
 
-        m.shape_transform = torch.tensor(transform_flatten_list(self.shape_transform), dtype=torch.float32, device=adapter)
-        m.shape_body = torch.tensor(self.shape_body, dtype=torch.int32, device=adapter)
-        m.shape_geo_type = torch.tensor(self.shape_geo_type, dtype=torch.int32, device=adapter)
+        upload.add('shape_transform', _transform_array(self.shape_transform), np.float32)
+        upload.add('shape_body', self.shape_body, np.int32)
+        upload.add('shape_geo_type', self.shape_geo_type, np.int32)
         m.shape_geo_src = self.shape_geo_src
-        m.shape_geo_scale = torch.tensor(self.shape_geo_scale, dtype=torch.float32, device=adapter)
-        m.shape_materials = torch.tensor(self.shape_materials, dtype=torch.float32, device=adapter)
+        upload.add('shape_geo_scale', host['shape_geo_scale'], np.float32)
+        upload.add('shape_materials', self.shape_materials, np.float32)
 
         #---------------------
         # springs
 
-        m.spring_indices = torch.tensor(self.spring_indices, dtype=torch.int32, device=adapter)
-        m.spring_rest_length = torch.tensor(self.spring_rest_length, dtype=torch.float32, device=adapter)
-        m.spring_stiffness = torch.tensor(self.spring_stiffness, dtype=torch.float32, device=adapter)
-        m.spring_damping = torch.tensor(self.spring_damping, dtype=torch.float32, device=adapter)
-        m.spring_control = torch.tensor(self.spring_control, dtype=torch.float32, device=adapter)
+        upload.add('spring_indices', np.asarray(self.spring_indices), np.int32)
+        upload.add('spring_rest_length', host['spring_rest_length'], np.float32)
+        upload.add('spring_stiffness', host['spring_stiffness'], np.float32)
+        upload.add('spring_damping', host['spring_damping'], np.float32)
+        upload.add('spring_control', host['spring_control'], np.float32)
 
         #---------------------
         # triangles
 
-        m.tri_indices = torch.tensor(self.tri_indices, dtype=torch.int32, device=adapter)
-        m.tri_poses = torch.tensor(self.tri_poses, dtype=torch.float32, device=adapter)
-        m.tri_activations = torch.tensor(self.tri_activations, dtype=torch.float32, device=adapter)
+        upload.add('tri_indices', self.tri_indices, np.int32)
+        upload.add('tri_poses', host['tri_poses'], np.float32)
+        upload.add('tri_activations', host['tri_activations'], np.float32)
 
         #---------------------
         # edges
 
-        m.edge_indices = torch.tensor(self.edge_indices, dtype=torch.int32, device=adapter)
-        m.edge_rest_angle = torch.tensor(self.edge_rest_angle, dtype=torch.float32, device=adapter)
+        upload.add('edge_indices', self.edge_indices, np.int32)
+        upload.add('edge_rest_angle', host['edge_rest_angle'], np.float32)
 
         #---------------------
         # tetrahedra
 
-        m.tet_indices = torch.tensor(self.tet_indices, dtype=torch.int32, device=adapter)
-        m.tet_poses = torch.tensor(self.tet_poses, dtype=torch.float32, device=adapter)
-        m.tet_activations = torch.tensor(self.tet_activations, dtype=torch.float32, device=adapter)
-        m.tet_mu = torch.tensor(self.tet_mu, dtype=torch.float32, device=adapter)
-        m.tet_lambda = torch.tensor(self.tet_lambda, dtype=torch.float32, device=adapter)
-        m.tet_damping = torch.tensor(self.tet_damping, dtype=torch.float32, device=adapter)
+        upload.add('tet_indices', self.tet_indices, np.int32)
+        upload.add('tet_poses', host['tet_poses'], np.float32)
+        upload.add('tet_activations', host['tet_activations'], np.float32)
+        upload.add('tet_mu', host['tet_mu'], np.float32)
+        upload.add('tet_lambda', host['tet_lambda'], np.float32)
+        upload.add('tet_damping', host['tet_damping'], np.float32)
 
         #-----------------------
         # muscles
@@ -2265,125 +3012,121 @@ class ModelBuilder:
         muscle_count = len(self.muscle_start)
 
         # close the muscle waypoint indices
-        self.muscle_start.append(len(self.muscle_links))
+        muscle_start = _closed_start(self.muscle_start, len(self.muscle_links))
 
-        m.muscle_start = torch.tensor(self.muscle_start, dtype=torch.int32, device=adapter)
-        m.muscle_params = torch.tensor(self.muscle_params, dtype=torch.float32, device=adapter)
-        m.muscle_links = torch.tensor(self.muscle_links, dtype=torch.int32, device=adapter)
-        m.muscle_points = torch.tensor(self.muscle_points, dtype=torch.float32, device=adapter)
-        m.muscle_activation = torch.tensor(self.muscle_activation, dtype=torch.float32, device=adapter)
+        upload.add('muscle_start', muscle_start, np.int32)
+        upload.add('muscle_params', self.muscle_params, np.float32)
+        upload.add('muscle_links', self.muscle_links, np.int32)
+        upload.add('muscle_points', self.muscle_points, np.float32)
+        upload.add('muscle_activation', self.muscle_activation, np.float32)
 
         #--------------------------------------
         # articulations
 
         # build 6x6 spatial inertia and COM transform
-        body_X_cm = []
-        body_I_m = [] 
+        body_count = len(self.body_inertia)
 
-        for i in range(len(self.body_inertia)):
-            body_I_m.append(spatial_matrix_from_inertia(self.body_inertia[i], self.body_mass[i]))
-            body_X_cm.append(transform(self.body_com[i], quat_identity()))
-        
-        m.body_I_m = torch.tensor(body_I_m, dtype=torch.float32, device=adapter)
+        if body_count:
 
+            # spatial inertia about the COM: diag(I, m*1) for every body at once
+            body_I_m = np.zeros((body_count, 6, 6), dtype=np.float32)
+            body_I_m[:, 0:3, 0:3] = np.stack(self.body_inertia)
+            body_I_m[:, 3:6, 3:6] = np.einsum('n,ij->nij', np.asarray(self.body_mass), np.eye(3))
 
-        articulation_count = len(self.articulation_start)
-        joint_coord_count = len(self.joint_q)
-        joint_dof_count = len(self.joint_qd)
+            # COM transforms with identity rotation, stored flat as (p, q)
+            body_X_cm = np.zeros((body_count, 7), dtype=np.float32)
+            body_X_cm[:, 6] = 1.0
+            body_X_cm[:, 0:3] = np.asarray(self.body_com, dtype=np.float32).reshape(body_count, 3)
 
-        # 'close' the start index arrays with a sentinel value
-        self.joint_q_start.append(len(self.joint_q))
-        self.joint_qd_start.append(len(self.joint_qd))
-        self.articulation_start.append(len(self.joint_type))        
+        else:
 
-        # calculate total size and offsets of Jacobian and mass matrices for entire system
-        m.J_size = 0
-        m.M_size = 0
-        m.H_size = 0
+            # empty, as the tensors created from empty lists
+            body_I_m = np.empty(0, dtype=np.float32)
+            body_X_cm = np.empty(0, dtype=np.float32)
 
-        articulation_J_start = []
-        articulation_M_start = []
-        articulation_H_start = []
+        upload.add('body_I_m', body_I_m, np.float32)
 
-        articulation_M_rows = []
-        articulation_H_rows = []
-        articulation_J_rows = []
-        articulation_J_cols = []
 
-        articulation_dof_start = []
-        articulation_coord_start = []
+        articulation_count = len(self.articulation_start)
+        joint_coord_count = len(self.joint_q)
+        joint_dof_count = len(self.joint_qd)
+        link_count = len(self.joint_type)
+
+        # 'close' the start index arrays with a sentinel value, the builder lists are
+        # left untouched so that finalize can be called more than once
+        joint_q_start = _closed_start(self.joint_q_start, joint_coord_count)
+        joint_qd_start = _closed_start(self.joint_qd_start, joint_dof_count)
+        articulation_start = _closed_start(self.articulation_start, link_count)
 
-        for i in range(articulation_count):
+        # calculate total size and offsets of Jacobian and mass matrices for entire system
 
-            first_joint = self.articulation_start[i]
-            last_joint = self.articulation_start[i+1]
+        first_joint = articulation_start[:-1]
+        last_joint = articulation_start[1:]
 
-            first_coord = self.joint_q_start[first_joint]
-            last_coord = self.joint_q_start[last_joint]
+        articulation_coord_start = joint_q_start[first_joint]
+        articulation_dof_start = joint_qd_start[first_joint]
 
-            first_dof = self.joint_qd_start[first_joint]
-            last_dof = self.joint_qd_start[last_joint]
+        joint_count = last_joint - first_joint
+        dof_count = joint_qd_start[last_joint] - articulation_dof_start
 
-            joint_count = last_joint-first_joint
-            dof_count = last_dof-first_dof
-            coord_count = last_coord-first_coord
+        # bit of data duplication here, but will leave it as such for clarity
+        articulation_M_rows = joint_count*6
+        articulation_H_rows = dof_count
+        articulation_J_rows = joint_count*6
+        articulation_J_cols = dof_count
 
-            articulation_J_start.append(m.J_size)
-            articulation_M_start.append(m.M_size)
-            articulation_H_start.append(m.H_size)
-            articulation_dof_start.append(first_dof)
-            articulation_coord_start.append(first_coord)
+        J_sizes = 6*joint_count*dof_count
+        M_sizes = 6*joint_count*6*joint_count
+        H_sizes = dof_count*dof_count
 
-            # bit of data duplication here, but will leave it as such for clarity
-            articulation_M_rows.append(joint_count*6)
-            articulation_H_rows.append(dof_count)
-            articulation_J_rows.append(joint_count*6)
-            articulation_J_cols.append(dof_count)
+        # matrices are stored back to back, offsets are the exclusive prefix sums of the sizes
+        articulation_J_start = np.cumsum(J_sizes) - J_sizes
+        articulation_M_start = np.cumsum(M_sizes) - M_sizes
+        articulation_H_start = np.cumsum(H_sizes) - H_sizes
 
-            m.J_size += 6*joint_count*dof_count
-            m.M_size += 6*joint_count*6*joint_count
-            m.H_size += dof_count*dof_count
-            
+        m.J_size = int(J_sizes.sum())
+        m.M_size = int(M_sizes.sum())
+        m.H_size = int(H_sizes.sum())
 
-        m.articulation_joint_start = torch.tensor(self.articulation_start, dtype=torch.int32, device=adapter)
+        upload.add('articulation_joint_start', articulation_start, np.int32)
 
         # matrix offsets for batched gemm
-        m.articulation_J_start = torch.tensor(articulation_J_start, dtype=torch.int32, device=adapter)
-        m.articulation_M_start = torch.tensor(articulation_M_start, dtype=torch.int32, device=adapter)
-        m.articulation_H_start = torch.tensor(articulation_H_start, dtype=torch.int32, device=adapter)
+        upload.add('articulation_J_start', articulation_J_start, np.int32)
+        upload.add('articulation_M_start', articulation_M_start, np.int32)
+        upload.add('articulation_H_start', articulation_H_start, np.int32)
         
-        m.articulation_M_rows = torch.tensor(articulation_M_rows, dtype=torch.int32, device=adapter)
-        m.articulation_H_rows = torch.tensor(articulation_H_rows, dtype=torch.int32, device=adapter)
-        m.articulation_J_rows = torch.tensor(articulation_J_rows, dtype=torch.int32, device=adapter)
-        m.articulation_J_cols = torch.tensor(articulation_J_cols, dtype=torch.int32, device=adapter)
+        upload.add('articulation_M_rows', articulation_M_rows, np.int32)
+        upload.add('articulation_H_rows', articulation_H_rows, np.int32)
+        upload.add('articulation_J_rows', articulation_J_rows, np.int32)
+        upload.add('articulation_J_cols', articulation_J_cols, np.int32)
 
-        m.articulation_dof_start = torch.tensor(articulation_dof_start, dtype=torch.int32, device=adapter)
-        m.articulation_coord_start = torch.tensor(articulation_coord_start, dtype=torch.int32, device=adapter)
+        upload.add('articulation_dof_start', articulation_dof_start, np.int32)
+        upload.add('articulation_coord_start', articulation_coord_start, np.int32)
 
         # state (initial)
-        m.joint_q = torch.tensor(self.joint_q, dtype=torch.float32, device=adapter)
-        m.joint_qd = torch.tensor(self.joint_qd, dtype=torch.float32, device=adapter)
+        upload.add('joint_q', np.asarray(self.joint_q), np.float32)
+        upload.add('joint_qd', np.asarray(self.joint_qd), np.float32)
 
         # model
-        m.joint_type = torch.tensor(self.joint_type, dtype=torch.int32, device=adapter)
-        m.joint_parent = torch.tensor(self.joint_parent, dtype=torch.int32, device=adapter)
-        m.joint_X_pj = torch.tensor(transform_flatten_list(self.joint_X_pj), dtype=torch.float32, device=adapter)
-        m.joint_X_cm = torch.tensor(transform_flatten_list(body_X_cm), dtype=torch.float32, device=adapter)
-        m.joint_axis = torch.tensor(self.joint_axis, dtype=torch.float32, device=adapter)
-        m.joint_q_start = torch.tensor(self.joint_q_start, dtype=torch.int32, device=adapter) 
-        m.joint_qd_start = torch.tensor(self.joint_qd_start, dtype=torch.int32, device=adapter)
+        upload.add('joint_type', np.asarray(self.joint_type), np.int32)
+        upload.add('joint_parent', np.asarray(self.joint_parent), np.int32)
+        upload.add('joint_X_pj', _transform_array(self.joint_X_pj), np.float32)
+        upload.add('joint_X_cm', body_X_cm, np.float32)
+        upload.add('joint_axis', self.joint_axis, np.float32)
+        upload.add('joint_q_start', joint_q_start, np.int32)
+        upload.add('joint_qd_start', joint_qd_start, np.int32)
 
         # dynamics properties
-        m.joint_armature = torch.tensor(self.joint_armature, dtype=torch.float32, device=adapter)
+        upload.add('joint_armature', np.asarray(self.joint_armature), np.float32)
         
-        m.joint_target = torch.tensor(self.joint_target, dtype=torch.float32, device=adapter)
-        m.joint_target_ke = torch.tensor(self.joint_target_ke, dtype=torch.float32, device=adapter)
-        m.joint_target_kd = torch.tensor(self.joint_target_kd, dtype=torch.float32, device=adapter)
+        upload.add('joint_target', np.asarray(self.joint_target), np.float32)
+        upload.add('joint_target_ke', np.asarray(self.joint_target_ke), np.float32)
+        upload.add('joint_target_kd', np.asarray(self.joint_target_kd), np.float32)
 
-        m.joint_limit_lower = torch.tensor(self.joint_limit_lower, dtype=torch.float32, device=adapter)
-        m.joint_limit_upper = torch.tensor(self.joint_limit_upper, dtype=torch.float32, device=adapter)
-        m.joint_limit_ke = torch.tensor(self.joint_limit_ke, dtype=torch.float32, device=adapter)
-        m.joint_limit_kd = torch.tensor(self.joint_limit_kd, dtype=torch.float32, device=adapter)
+        upload.add('joint_limit_lower', np.asarray(self.joint_limit_lower), np.float32)
+        upload.add('joint_limit_upper', np.asarray(self.joint_limit_upper), np.float32)
+        upload.add('joint_limit_ke', np.asarray(self.joint_limit_ke), np.float32)
+        upload.add('joint_limit_kd', np.asarray(self.joint_limit_kd), np.float32)
 
         # counts
         m.particle_count = len(self.particle_q)
@@ -2393,7 +3136,7 @@ class ModelBuilder:
         m.joint_dof_count = joint_dof_count
         m.muscle_count = muscle_count
 
-        m.link_count = len(self.joint_type)        
+        m.link_count = link_count
         m.shape_count = len(self.shape_geo_type)
         m.tri_count = len(self.tri_poses)
         m.tet_count = len(self.tet_poses)
@@ -2415,63 +3158,69 @@ class ModelBuilder:
         m.alloc_mass_matrix()
 
         # cutting data
-        m.cut_edge_indices = torch.tensor(self.cut_edge_indices, dtype=torch.int32, device=adapter)
+        upload.add('cut_edge_indices', self.cut_edge_indices, np.int32)
         m.cut_edge_count = len(self.cut_edge_indices)
-        m.cut_edge_coords = torch.tensor(self.cut_edge_coords, dtype=torch.float32, device=adapter, requires_grad=requires_grad)
-        m.cut_tri_indices = torch.tensor(self.cut_tri_indices, dtype=torch.int32, device=adapter)
-        m.sdf_ke = torch.tensor(self.sdf_ke, dtype=torch.float32, device=adapter, requires_grad=requires_grad)
-        m.sdf_kd = torch.tensor(self.sdf_kd, dtype=torch.float32, device=adapter, requires_grad=requires_grad)
-        m.sdf_kf = torch.tensor(self.sdf_kf, dtype=torch.float32, device=adapter, requires_grad=requires_grad)
-        m.sdf_mu = torch.tensor(self.sdf_mu, dtype=torch.float32, device=adapter, requires_grad=requires_grad)
-        m.sdf_radius = torch.tensor(self.sdf_radius, dtype=torch.float32, device=adapter, requires_grad=requires_grad)
+        upload.add('cut_edge_coords', self.cut_edge_coords, np.float32, requires_grad)
+        upload.add('cut_tri_indices', self.cut_tri_indices, np.int32)
+        upload.add('sdf_ke', self.sdf_ke, np.float32, requires_grad)
+        upload.add('sdf_kd', self.sdf_kd, np.float32, requires_grad)
+        upload.add('sdf_kf', self.sdf_kf, np.float32, requires_grad)
+        upload.add('sdf_mu', self.sdf_mu, np.float32, requires_grad)
+        upload.add('sdf_radius', self.sdf_radius, np.float32, requires_grad)
         m.cut_tri_count = len(self.cut_tri_indices)
-        m.cut_virtual_tri_indices = torch.tensor(self.cut_virtual_tri_indices, dtype=torch.int32, device=adapter)
+        upload.add('cut_virtual_tri_indices', self.cut_virtual_tri_indices, np.int32)
         m.cut_virtual_tri_count = len(self.cut_virtual_tri_indices)
-        m.cut_virtual_tri_indices_above_cut = torch.tensor(self.cut_virtual_tri_indices_above_cut, dtype=torch.int32, device=adapter)
-        m.cut_virtual_tri_indices_below_cut = torch.tensor(self.cut_virtual_tri_indices_below_cut, dtype=torch.int32, device=adapter)
-        m.cut_spring_indices = torch.tensor(self.cut_spring_indices, dtype=torch.int32, device=adapter)
-        m.cut_spring_normal = torch.tensor(self.cut_spring_normal, dtype=torch.float32, device=adapter, requires_grad=requires_grad)
-        m.cut_spring_rest_length = torch.tensor(self.cut_spring_rest_length, dtype=torch.float32, device=adapter, requires_grad=requires_grad)
-        m.cut_spring_stiffness = torch.tensor(self.cut_spring_stiffness, dtype=torch.float32, device=adapter, requires_grad=requires_grad)
-        m.cut_spring_damping = torch.tensor(self.cut_spring_damping, dtype=torch.float32, device=adapter, requires_grad=requires_grad)
-        m.cut_spring_softness = torch.tensor(self.cut_spring_softness, dtype=torch.float32, device=adapter, requires_grad=requires_grad)
+        upload.add('cut_virtual_tri_indices_above_cut', self.cut_virtual_tri_indices_above_cut, np.int32)
+        upload.add('cut_virtual_tri_indices_below_cut', self.cut_virtual_tri_indices_below_cut, np.int32)
+        upload.add('cut_spring_indices', self.cut_spring_indices, np.int32)
+        upload.add('cut_spring_normal', self.cut_spring_normal, np.float32, requires_grad)
+        upload.add('cut_spring_rest_length', self.cut_spring_rest_length, np.float32, requires_grad)
+        upload.add('cut_spring_stiffness', self.cut_spring_stiffness, np.float32, requires_grad)
+        upload.add('cut_spring_damping', self.cut_spring_damping, np.float32, requires_grad)
+        upload.add('cut_spring_softness', self.cut_spring_softness, np.float32, requires_grad)
         m.cut_spring_count = len(self.cut_spring_indices)
 
         m.knife_link_index = self.knife_link_index
 
-        m.knife_tri_indices = torch.tensor(self.knife_tri_indices, dtype=torch.int32, device=adapter)
+        upload.add('knife_tri_indices', self.knife_tri_indices, np.int32)
         m.knife_tri_count = len(self.knife_tri_indices) // 3
-        m.knife_tri_vertices = torch.tensor(self.knife_tri_vertices, dtype=torch.float32, device=adapter)
+        upload.add('knife_tri_vertices', self.knife_tri_vertices, np.float32)
 
         # coupling springs
         m.coupling_spring_count = len(self.coupling_spring_indices)
-        m.coupling_spring_indices = torch.tensor(self.coupling_spring_indices, dtype=torch.int32, device=adapter)  # [rigid_body_index, particle_index]
-        m.coupling_spring_moment_arm = torch.tensor(self.coupling_spring_moment_arm, dtype=torch.float32, device=adapter, requires_grad=requires_grad)
-        m.coupling_spring_stiffness = torch.tensor(self.coupling_spring_stiffness, dtype=torch.float32, device=adapter, requires_grad=requires_grad)
-        m.coupling_spring_damping = torch.tensor(self.coupling_spring_damping, dtype=torch.float32, device=adapter, requires_grad=requires_grad)
+        upload.add('coupling_spring_indices', self.coupling_spring_indices, np.int32)  # [rigid_body_index, particle_index]
+        upload.add('coupling_spring_moment_arm', self.coupling_spring_moment_arm, np.float32, requires_grad)
+        upload.add('coupling_spring_stiffness', self.coupling_spring_stiffness, np.float32, requires_grad)
+        upload.add('coupling_spring_damping', self.coupling_spring_damping, np.float32, requires_grad)
 
         # dependent particles
         m.dependent_particle_count = len(self.dependent_particle_indices)
-        m.dependent_particle_indices = torch.tensor(self.dependent_particle_indices, dtype=torch.int32, device=adapter)  # [rigid_body_index, particle_index]
-        m.dependent_particle_moment_arm = torch.tensor(self.dependent_particle_moment_arm, dtype=torch.float32, device=adapter, requires_grad=requires_grad)
+        upload.add('dependent_particle_indices', self.dependent_particle_indices, np.int32)  # [rigid_body_index, particle_index]
+        upload.add('dependent_particle_moment_arm', self.dependent_particle_moment_arm, np.float32, requires_grad)
 
         if knife is not None:
-            m.knife_params = torch.tensor([knife.spine_dim, knife.spine_height, knife.edge_dim, knife.tip_height, knife.depth],
-                                        dtype=torch.float32,
-                                        device=adapter,
-                                        requires_grad=requires_grad)
+            upload.add('knife_params', [knife.spine_dim, knife.spine_height, knife.edge_dim, knife.tip_height, knife.depth], np.float32, requires_grad)
 
         # contact coords store barycentric edge coordinate of contact between edge and knife
-        m.cut_edge_contact_coord = torch.tensor(np.zeros(len(self.cut_edge_indices)), dtype=torch.float32, device=adapter, requires_grad=requires_grad)
-        m.cut_edge_contact_dist = torch.tensor(np.ones(len(self.cut_edge_indices)), dtype=torch.float32, device=adapter, requires_grad=requires_grad)
-        m.cut_edge_contact_normal = torch.tensor(np.zeros((len(self.cut_edge_indices), 3)), dtype=torch.float32, device=adapter, requires_grad=requires_grad)
+        m.cut_edge_contact_coord = torch.zeros(m.cut_edge_count, dtype=torch.float32, device=adapter, requires_grad=requires_grad)
+        m.cut_edge_contact_dist = torch.ones(m.cut_edge_count, dtype=torch.float32, device=adapter, requires_grad=requires_grad)
+        m.cut_edge_contact_normal = torch.zeros((m.cut_edge_count, 3), dtype=torch.float32, device=adapter, requires_grad=requires_grad)
+
+        if verbose:
+            print("self.cut_edge_indices:", np.shape(self.cut_edge_indices))
+            print("self.cut_spring_indices:", np.shape(self.cut_spring_indices))
+            print("self.cut_virtual_tri_indices:", np.shape(self.cut_virtual_tri_indices))
+
+        contact_mask = np.ones(m.particle_count, dtype=np.float32)
+        if self.contactless_particles:
+            contact_mask[np.fromiter(self.contactless_particles, dtype=np.int64, count=len(self.contactless_particles))] = 0.0
+        upload.add('contact_mask', contact_mask, np.float32)
 
-        print("self.cut_edge_indices:", np.shape(self.cut_edge_indices))
-        print("self.cut_spring_indices:", np.shape(self.cut_spring_indices))
-        print("self.cut_virtual_tri_indices:", np.shape(self.cut_virtual_tri_indices))
+        # transfer all arrays to the adapter at once
+        upload.upload()
 
-        m.contact_mask = torch.tensor([(0.0 if i in self.contactless_particles else 1.0) for i in range(len(self.particle_q))],
-                                      dtype=torch.float32,
-                                      device=adapter)
+        # the model is ready for use once the transfers have completed
+        if (torch.device(adapter).type == "cuda"):
+            torch.cuda.current_stream(adapter).synchronize()
 
         return m
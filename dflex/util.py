@@ -38,6 +38,11 @@ def normalize(v):
     return v / norm
 
 
+def normalize_batch(v):
+    norm = np.linalg.norm(v, axis=1, keepdims=True)
+    return np.divide(v, norm, out=np.array(v, dtype=float), where=norm != 0.0)
+
+
 def skew(v):
 
     return np.array([[0, -v[2], v[1]], [v[2], 0, -v[0]], [-v[1], v[0], 0]])
@@ -94,6 +99,30 @@ def quat_to_matrix(q):
     return np.array([c1, c2, c3]).T
 
 
+# convert an (N, 4) array of quaternions to an (N, 3, 3) array of rotation matrices,
+# matches quat_to_matrix() (and quat_rotate()) for each row
+def quat_to_matrix_batch(q):
+    q = np.asarray(q)
+    axis = q[:, 0:3]
+    w = q[:, 3]
+
+    # R = (2w^2 - 1) I + 2w [axis]_x + 2 axis axis^T
+    R = np.einsum('n,ij->nij', 2.0 * w * w - 1.0, np.eye(3)) + 2.0 * np.einsum('ni,nj->nij', axis, axis)
+
+    wx = 2.0 * w * axis[:, 0]
+    wy = 2.0 * w * axis[:, 1]
+    wz = 2.0 * w * axis[:, 2]
+
+    R[:, 0, 1] -= wz
+    R[:, 0, 2] += wy
+    R[:, 1, 0] += wz
+    R[:, 1, 2] -= wx
+    R[:, 2, 0] -= wy
+    R[:, 2, 1] += wx
+
+    return R
+
+
 def quat_rpy(roll, pitch, yaw):
 
     cy = math.cos(yaw * 0.5)
@@ -233,7 +262,10 @@ def transform_expand_list(xforms):
     return list(map(exp, xforms))
 
 def transform_inertia(m, I, p, q):
-    R = quat_to_matrix(q)
+    return transform_inertia_matrix(m, I, p, quat_to_matrix(q))
+
+
+def transform_inertia_matrix(m, I, p, R):
 
     # Steiner's theorem
     return R * I * R.T + m * (np.dot(p, p) * np.eye(3) - np.outer(p, p))
@@ -491,6 +523,13 @@ class MeshAdjacency:
     def opposite_vertex(self, edge):
         pass
 
+    def interior_edge_array(self):
+        """Returns an (M, 4) int32 array of (o0, o1, v0, v1) for all edges shared by two faces"""
+
+        edges = [(e.o0, e.o1, e.v0, e.v1) for e in self.edges.values() if e.f0 != -1 and e.f1 != -1]
+
+        return np.array(edges, dtype=np.int32).reshape(-1, 4)
+
 
 
 
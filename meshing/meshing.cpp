@@ -705,13 +705,29 @@ private:
 
 // Python bindings
 
+// The cut results are returned as copies (lists, or arrays for the copy
+// sources), not as views of the vectors, which a later cut() may reallocate.
+
+static py::array_t<int> copy_sources(const std::map<int, int> &copy_from) {
+  py::array_t<int> sources(static_cast<py::ssize_t>(copy_from.size()));
+  auto out = sources.mutable_unchecked<1>();
+  py::ssize_t i = 0;
+  for (const auto &entry : copy_from) {
+    out(i++) = entry.second;
+  }
+  return sources;
+}
+
 PYBIND11_MODULE(meshcutter, m) {
   py::class_<Meshing>(m, "MeshCutter")
       .def(py::init<const std::vector<Tri> &, const std::vector<Tet> &,
                     const std::vector<Vec3> &>(),
            py::arg("tri_indices"), py::arg("tet_indices"),
            py::arg("particle_x"))
-      .def("cut", &Meshing::cut, py::arg("surface_triangles"))
+      // the cut only touches C++ data, other Python threads may run meanwhile
+      // but must not use the same MeshCutter until cut() returns
+      .def("cut", &Meshing::cut, py::arg("surface_triangles"),
+           py::call_guard<py::gil_scoped_release>())
       .def_readonly("tri_indices", &Meshing::tri_indices)
       .def_readonly("tet_indices", &Meshing::tet_indices)
       .def_readonly("particle_x", &Meshing::particle_x)
@@ -732,8 +748,16 @@ PYBIND11_MODULE(meshcutter, m) {
       .def_readonly("cut_spring_indices_interior",
                     &Meshing::cut_spring_indices_interior)
 
-      .def_readonly("vertex_copy_from", &Meshing::vertex_copy_from)
-      .def_readonly("tet_copy_from", &Meshing::tet_copy_from)
+      // original IDs of the copied vertices and tets, ordered by the IDs of
+      // the copies (which are assigned consecutively)
+      .def_property_readonly("vertex_copy_from",
+                             [](const Meshing &meshing) {
+                               return copy_sources(meshing.vertex_copy_from);
+                             })
+      .def_property_readonly("tet_copy_from",
+                             [](const Meshing &meshing) {
+                               return copy_sources(meshing.tet_copy_from);
+                             })
 
       .def_readonly("cut_virtual_tri_indices",
                     &Meshing::cut_virtual_tri_indices)
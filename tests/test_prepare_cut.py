@@ -0,0 +1,55 @@
+import os
+
+import numpy as np
+
+import dflex as df
+
+
+BASELINE = os.path.join(os.path.dirname(__file__), "data", "prepare_cut_python.npz")
+
+
+def build_cut_grid():
+    builder = df.ModelBuilder()
+    builder.add_soft_grid(pos=(0.0, 0.0, 0.0),
+                          rot=df.quat_identity(),
+                          vel=(0.0, 0.0, 0.0),
+                          dim_x=2,
+                          dim_y=1,
+                          dim_z=1,
+                          cell_x=0.1,
+                          cell_y=0.1,
+                          cell_z=0.1,
+                          density=10.0,
+                          k_mu=1e3,
+                          k_lambda=1e3,
+                          k_damp=0.1)
+
+    # slanted plane that crosses the middle column of cells
+    surface_triangles = np.array([[(0.13, -1.0, -1.0), (0.13, 1.0, -1.0), (0.17, -1.0, 1.0)],
+                                  [(0.17, -1.0, 1.0), (0.13, 1.0, -1.0), (0.17, 1.0, 1.0)]])
+
+    builder.prepare_cut(builder.tet_indices,
+                        surface_triangles,
+                        surface_contact_ke=5e3,
+                        surface_cut_spring_kd=3.0,
+                        use_cpp=False)
+    return builder
+
+
+def test_prepare_cut_python_matches_baseline():
+    builder = build_cut_grid()
+    expected = np.load(BASELINE)
+
+    for name in expected.files:
+        if name in ("contactless_particles", "cut_tets"):
+            actual = np.array(sorted(getattr(builder, name)))
+        elif name == "cut_duplicated_x":
+            actual = np.array(sorted(builder.cut_duplicated_x.items()))
+        else:
+            actual = np.asarray(getattr(builder, name))
+
+        assert actual.shape == expected[name].shape, name
+        if np.issubdtype(expected[name].dtype, np.integer):
+            np.testing.assert_array_equal(actual, expected[name], err_msg=name)
+        else:
+            np.testing.assert_allclose(actual, expected[name], rtol=1e-6, atol=1e-9, err_msg=name)